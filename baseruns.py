@@ -0,0 +1,81 @@
+'''Vectorized BaseRuns run estimators.
+
+All four estimators share David Smyth's form
+
+    BaseRuns = Baserunners*Advancement/(Advancement + Outs) + ForSureRuns
+
+and only differ in which counts go into it:
+
+- BaseRuns:   real counts, Outs = 3IP
+- xBaseRuns:  expected ball-in-play outcomes with real BB and SO, counted outs
+- piBaseRuns: every count expected from the Pitching+ model, counted outs
+- stBaseRuns: every count expected from the Stuff+ model, counted outs
+
+Counts are float matrices with the events in the order of ``events`` along the
+last axis, so expected (fractional) counts need no special handling. A whole
+league of pitcher-seasons, every variant and any number of weight vectors are
+estimated with a handful of array operations.
+'''
+import numpy as np
+
+
+events   = ['S','D','T','HR','BB','SF','GIDP','SO','BIPOut','SB','CS']
+variants = ['bsr', 'xbsr', 'pibsr', 'stbsr']
+
+_S, _D, _T, _HR, _BB, _SF, _GIDP, _SO, _BIPOut, _SB, _CS = range(len(events))
+
+# advancement weights fit to the 2021-2024 pitcher-seasons, in the order of ``events``
+default_weights = np.array([ 0.806441,  1.677393,  2.170943,  1.001727,  0.289152,  4.356667,
+                            -0.930035,  0.123727,  0.045316,  0.539515, -1.939014])
+
+
+def counts_from_frame(frame, prefix=''):
+    '''The counts matrix of a frame with one column per event, e.g. ``piS``, ``piD``, ...'''
+    return frame[[prefix+e for e in events]].to_numpy(dtype=float)
+
+
+def baserunners(counts):
+    return counts[...,_S] + counts[...,_D] + counts[...,_T] + counts[...,_BB]
+
+
+def counted_outs(counts):
+    '''Outs counted from the events. A double play is two outs and a sac fly one.'''
+    return counts[...,_SO] + counts[...,_BIPOut] + counts[...,_CS] + counts[...,_SF] + 2*counts[...,_GIDP]
+
+
+def advancement(counts, b=default_weights):
+    '''b·counts for every row. With ``b`` of shape (k, 11) the weight sets are
+    stacked on a new leading axis.'''
+    b = np.asarray(b, dtype=float)
+    adv = counts @ b.T
+    return adv if b.ndim == 1 else np.moveaxis(adv, -1, 0)
+
+
+def baseruns(counts, b=default_weights, outs=None):
+    '''BaseRuns for every row of ``counts`` (shape (..., 11)).
+
+    ``outs`` defaults to the outs counted from strikeouts, ball-in-play outs,
+    caught stealings, sac flies and double plays (two each), as in the x/pi/st
+    variants.
+    '''
+    counts = np.asarray(counts, dtype=float)
+    outs   = counted_outs(counts) if outs is None else np.asarray(outs, dtype=float)
+    adv    = advancement(counts, b)
+    denom  = adv + outs
+    score_rate = np.divide(adv, denom, out=np.zeros(np.broadcast(adv, denom).shape),
+                           where=denom != 0)
+    return baserunners(counts)*score_rate + counts[...,_HR]
+
+
+def baseruns_all(counts, outs, b=default_weights):
+    '''All four variants at once.
+
+    ``counts`` has shape (4, n, 11), holding the real, x, pi and st counts of the
+    same n pitcher-seasons in the order of ``variants``, and ``outs`` the n real
+    outs (3IP) used by plain BaseRuns. Returns shape (4, n), or (k, 4, n) when
+    ``b`` holds k weight sets.
+    '''
+    counts = np.asarray(counts, dtype=float)
+    all_outs    = counted_outs(counts)
+    all_outs[0] = outs
+    return baseruns(counts, b, all_outs)
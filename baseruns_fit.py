@@ -0,0 +1,114 @@
+'''Fitting the BaseRuns advancement weights.
+
+The weights ``b`` minimise the weighted RMSE between a BaseRuns estimate and the
+runs actually allowed over a set of pitcher-seasons. Since
+
+    BaseRuns = A*B/(B+C) + D,   B = X·b
+
+the Jacobian is analytic, d BaseRuns/d b = A*C/(B+C)^2 * X, and the fit is a
+Levenberg-Marquardt solve of an 11x11 system per iteration. Fits are batched
+over a leading axis of observation weights, so bootstrap refits run as one
+vectorized solve rather than one fit per replicate.
+'''
+from collections import namedtuple
+import numpy as np
+from baseruns import baserunners, counted_outs, advancement, default_weights, _HR
+
+
+FitResult = namedtuple('FitResult', ['b', 'rmse', 'n_iter', 'converged'])
+
+
+def _prepare(counts, runs, weights, outs):
+    counts = np.asarray(counts, dtype=float)
+    runs   = np.asarray(runs, dtype=float)
+    outs   = counted_outs(counts) if outs is None else np.asarray(outs, dtype=float)
+    weights = np.ones_like(runs) if weights is None else np.asarray(weights, dtype=float)
+    return counts, baserunners(counts), outs, counts[:,_HR], runs, weights
+
+
+def _residuals(X, A, C, D, runs, b):
+    B   = advancement(X, b)
+    den = B + C
+    return A*B/den + D - runs, den
+
+
+def _weighted_loss(w, r):
+    return (w*r*r).sum(axis=-1)
+
+
+def _solve(X, A, C, D, runs, w, b0, max_iter, tol):
+    # w has shape (m, n): m independent fits of the same n pitcher-seasons
+    m, n_events = w.shape[0], X.shape[1]
+    XX   = np.einsum('ni,nj->nij', X, X).reshape(X.shape[0], -1)
+    b    = np.array(np.broadcast_to(b0, (m, n_events)), dtype=float)
+    lam  = np.full(m, 1e-3)
+    r, den = _residuals(X, A, C, D, runs, b)
+    loss = _weighted_loss(w, r)
+    done = np.zeros(m, dtype=bool)
+    for n_iter in range(1, max_iter+1):
+        g    = A*C/den**2
+        JtWJ = ((w*g*g) @ XX).reshape(m, n_events, n_events)
+        JtWr = (w*g*r) @ X
+        diag = np.einsum('mii->mi', JtWJ)
+        H    = JtWJ + (lam[:,None]*np.maximum(diag, 1e-12))[:,:,None]*np.eye(n_events)
+        step = -np.linalg.solve(H, JtWr[...,None])[...,0]
+        step[done] = 0
+
+        b_new = b + step
+        r_new, den_new = _residuals(X, A, C, D, runs, b_new)
+        loss_new = _weighted_loss(w, r_new)
+        accept = (loss_new <= loss) & np.isfinite(loss_new) & (den_new > 0).all(axis=-1) & ~done
+
+        done |= accept & (np.abs(loss - loss_new) <= tol*np.maximum(loss, 1e-12))
+        b[accept], r[accept], den[accept], loss[accept] = b_new[accept], r_new[accept], den_new[accept], loss_new[accept]
+        lam = np.where(accept, lam*0.3, lam*10)
+        done |= lam > 1e12
+        if done.all():
+            break
+    rmse = np.sqrt(loss/w.sum(axis=-1))
+    return b, rmse, n_iter, done
+
+
+def fit_weights(counts, runs, weights=None, outs=None, b0=None, max_iter=100, tol=1e-10):
+    '''Weights minimising the weighted RMSE of BaseRuns to ``runs``.
+
+    ``counts`` is the (n, 11) counts matrix of n pitcher-seasons, ``weights``
+    their observation weights (e.g. innings pitched), and ``outs`` the outs to
+    use, defaulting to the counted outs of the x/pi/st variants. Pass the
+    previous fit as ``b0`` to warm start.
+    '''
+    X, A, C, D, runs, w = _prepare(counts, runs, weights, outs)
+    b0 = default_weights if b0 is None else b0
+    b, rmse, n_iter, done = _solve(X, A, C, D, runs, w[None], b0, max_iter, tol)
+    return FitResult(b[0], rmse[0], n_iter, bool(done[0]))
+
+
+def bootstrap_weights(counts, runs, weights=None, outs=None, n_boot=200, b0=None,
+                      seed=None, chunk=100, max_iter=50, tol=1e-8):
+    '''``n_boot`` bootstrap refits of the weights, shape (n_boot, 11).
+
+    Each replicate reweights the pitcher-seasons with Poisson(1) counts, which
+    is a multinomial resample of the seasons in the large-n limit. Replicates
+    are warm started from the full-sample fit and solved ``chunk`` at a time.
+    '''
+    X, A, C, D, runs, w = _prepare(counts, runs, weights, outs)
+    if b0 is None:
+        b0 = fit_weights(X, runs, w, C).b
+    rng  = np.random.default_rng(seed)
+    fits = []
+    for start in range(0, n_boot, chunk):
+        m = min(chunk, n_boot-start)
+        boot_w = w*rng.poisson(1.0, size=(m, len(runs)))
+        fits.append(_solve(X, A, C, D, runs, boot_w, b0, max_iter, tol)[0])
+    return np.concatenate(fits)
+
+
+def fit_by_group(counts, runs, groups, weights=None, outs=None, b0=None, **kwargs):
+    '''A separate fit for every distinct value of ``groups`` (e.g. season or league),
+    each warm started from the pooled fit. Returns {group: FitResult}.'''
+    X, A, C, D, runs, w = _prepare(counts, runs, weights, outs)
+    groups = np.asarray(groups)
+    pooled = fit_weights(X, runs, w, C, b0, **kwargs)
+    return {g: fit_weights(X[groups == g], runs[groups == g], w[groups == g], C[groups == g],
+                           pooled.b, **kwargs)
+            for g in np.unique(groups)}
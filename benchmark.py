@@ -0,0 +1,188 @@
+'''Headless benchmarks of the app's page loads and reruns.
+
+Every scenario runs in a fresh process that drives ``streamlit_app.py`` through
+Streamlit's ``AppTest``, and records
+
+- wall_s:      wall time of the measured rerun (or import, figure build or name search)
+- peak_rss_mb: peak resident memory of the process
+- payload_kb:  serialized size of the grid and chart elements that were sent
+- session_kb:  memory held per extra concurrent session (session_memory only)
+
+The results are compared against ``benchmark_baselines.json``, and the run fails
+when any of them exceeds its baseline by more than the budgets below.
+
+    $ python benchmark.py                        # every scenario
+    $ python benchmark.py cold_start year_filter # just these
+    $ python benchmark.py --update               # store the results as the baselines
+'''
+import os, sys, json, time, resource, importlib, subprocess, tracemalloc
+
+
+here           = os.path.dirname(os.path.abspath(__file__))
+app_path       = os.path.join(here, 'streamlit_app.py')
+baselines_path = os.path.join(here, 'benchmark_baselines.json')
+
+expanders     = ['raa_exp', 'baseruns_exp', 'war_exp', 'framing_exp', 'corr_matrix', 'resp_exp', 'control_exp']
+heavy_modules = ['plotly.figure_factory', 'plotly.express', 'st_aggrid', 'scipy.sparse']
+selections    = [1, 10, 200]
+name_queries  = ['martinez', 'Sánchez', 'alvarez', 'wh', 'zack w', 'xyz']
+
+# a result regresses when it exceeds baseline*ratio + slack
+budgets = {'wall_s': (1.5, 0.25), 'peak_rss_mb': (1.2, 20), 'payload_kb': (1.1, 1), 'session_kb': (1.2, 50)}
+sessions = 5
+
+
+def _app():
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(app_path, default_timeout=300)
+    return at
+
+
+def _payload(at):
+    return sum(e.proto.ByteSize() for kind in ('component_instance', 'plotly_chart') for e in at.get(kind))
+
+
+def _timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    wall  = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return wall, _payload(at)
+
+
+def _cold_start():
+    return _timed_run(_app())
+
+
+def _rerun(setup):
+    def scenario():
+        at = _app()
+        at.run()
+        setup(at)
+        return _timed_run(at)
+    return scenario
+
+
+def _select(n):
+    # AppTest can't click grid rows, so the selected rows' figure is built directly as the app would
+    def scenario():
+        from war_data import load_leaderboard, war_names
+        from plots import selection_figure, legend_limit
+        selected = load_leaderboard().frame.iloc[:n]
+        start = time.perf_counter()
+        spec  = selection_figure(selected, war_names, bands=n > legend_limit).to_json()
+        return time.perf_counter() - start, len(spec)
+    return scenario
+
+
+def _name_search():
+    # the mean time of one search of the names of every season, once the index is built
+    from war_data import load_leaderboard
+    leaderboard = load_leaderboard()
+    start = time.perf_counter()
+    for query in name_queries:
+        leaderboard.name_mask(query)
+    return (time.perf_counter() - start)/len(name_queries), 0
+
+
+def _session_memory():
+    # the first session fills the process-wide caches, the rest only hold their own state
+    _app().run()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start  = time.perf_counter()
+    live   = [_app().run() for _ in range(sessions)]
+    wall   = (time.perf_counter() - start)/sessions
+    per_session = (tracemalloc.get_traced_memory()[0] - before)/sessions
+    tracemalloc.stop()
+    return wall, _payload(live[-1]), {'session_kb': round(per_session/1024, 1)}
+
+
+def _import(module):
+    def scenario():
+        start = time.perf_counter()
+        importlib.import_module(module)
+        return time.perf_counter() - start, 0
+    return scenario
+
+
+def _open(key):
+    def setup(at):
+        at.session_state[key] = True
+    return setup
+
+
+scenarios = {'cold_start':  _cold_start,
+             'year_filter': _rerun(lambda at: at.multiselect(key='years_select').set_value([2023])),
+             'team_filter': _rerun(lambda at: at.multiselect(key='teams_select').set_value(['NYY', 'LAD'])),
+             **{f'select_{n}': _select(n) for n in selections},
+             'name_search': _name_search,
+             **{f'open_{key}': _rerun(_open(key)) for key in expanders},
+             'session_memory': _session_memory,
+             **{f'import_{m}': _import(m) for m in heavy_modules}}
+
+
+def measure(name):
+    '''Run scenario ``name`` in this process and return its results.'''
+    wall, payload, *extra = scenarios[name]()
+    # ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024
+    return {'wall_s': round(wall, 4), 'peak_rss_mb': round(peak, 1), 'payload_kb': round(payload/1024, 1),
+            **(extra[0] if extra else {})}
+
+
+def run(name):
+    '''Run scenario ``name`` in a fresh process.'''
+    out = subprocess.run([sys.executable, __file__, '--child', name], capture_output=True, text=True, cwd=here)
+    if out.returncode:
+        raise RuntimeError(f'{name} failed:\n{out.stderr}')
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def regressions(results, baselines):
+    '''(scenario, metric, result, limit) for every result over its budget.'''
+    over = []
+    for name, result in results.items():
+        for metric, value in result.items():
+            if name not in baselines or metric not in baselines[name]:
+                continue
+            ratio, slack = budgets[metric]
+            limit = baselines[name][metric]*ratio + slack
+            if value > limit:
+                over.append((name, metric, value, round(limit, 4)))
+    return over
+
+
+def main(argv):
+    if argv[:1] == ['--child']:
+        print(json.dumps(measure(argv[1])))
+        return 0
+    update = '--update' in argv
+    names  = [a for a in argv if not a.startswith('--')] or list(scenarios)
+    baselines = {}
+    if os.path.exists(baselines_path):
+        with open(baselines_path) as f:
+            baselines = json.load(f)
+
+    results = {}
+    print(f'{"scenario":<28}{"wall_s":>10}{"peak_rss_mb":>14}{"payload_kb":>12}{"session_kb":>12}')
+    for name in names:
+        results[name] = run(name)
+        print(f'{name:<28}' + ''.join(f'{results[name].get(m, ""):>{w}}' for m, w in zip(budgets, (10, 14, 12, 12))))
+
+    if update:
+        with open(baselines_path, 'w') as f:
+            # the baselines of scenarios that no longer exist are dropped
+            kept = {name: b for name, b in baselines.items() if name in scenarios}
+            json.dump({**kept, **results}, f, indent=1)
+        print(f'baselines written to {baselines_path}')
+        return 0
+    over = regressions(results, baselines)
+    for name, metric, value, limit in over:
+        print(f'REGRESSION {name} {metric}: {value} > {limit}')
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,99 @@
+'''Bootstrap intervals of the WARs of every pitcher-season.
+
+Each pitcher-season's events are resampled with Poisson(1) weights, so in a
+replicate the count of every event is Poisson around its observed count. A
+replicate that moves a WAR's run input by dR moves the WAR by -dR/RPW. RPW is
+the season's Pythagenpat runs per win, 2*RPG^(1-0.285), with RPG the runs per
+game of both teams. The league adjustments are left fixed.
+
+Only some WARs have run inputs that are sums of counted events in the data files:
+
+- Runs Allowed, Baseball Reference, OAA: the pitcher's runs allowed
+- Pitching+, Stuff+: the pitch models' expected event counts, through BaseRuns
+
+The event counts behind the BaseRuns, xBaseRuns and FIP WARs aren't kept, so
+those get no interval. All replicates of a season are drawn as one array, and
+seasons run in parallel.
+
+    $ python bootstrap.py          # print the median interval widths
+    $ python bootstrap.py --write  # and write war_intervals.arrow
+'''
+import os, sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np, pandas as pd
+import storage
+from storage import data_dir, data_path
+from baseruns import baseruns, counts_from_frame
+from war_calc import pythagenpat_exponent
+
+
+# the run input of each WAR with an interval: 'runs' or the prefix of its event counts
+interval_sources = {'ra_war': 'runs', 'r_war': 'runs', 'oaa_war': 'runs', 'pitch_war': 'pi', 'stuff_war': 'st'}
+level = 0.9
+
+
+def runs_per_win(runs, outs):
+    '''Pythagenpat runs per win of a league with ``runs`` allowed over ``outs``.'''
+    rpg = 2*27*runs/outs
+    return 2*rpg**(1 - pythagenpat_exponent)
+
+
+def _poisson_deltas(rng, counts, n_boot):
+    # expected counts can be slightly negative, those are resampled as 0
+    mean = np.clip(counts, 0, None)
+    return rng.poisson(mean, size=(n_boot, *mean.shape)) - mean
+
+
+def _season_intervals(season, rpw, n_boot, seed, chunk):
+    rng = np.random.default_rng(seed)
+    runs   = season.runs.to_numpy(dtype=float)
+    counts = {p: counts_from_frame(season, p) for p in set(interval_sources.values()) - {'runs'}}
+    base   = {p: baseruns(c) for p, c in counts.items()}
+    deltas = {source: np.empty((n_boot, len(season))) for source in ['runs', *counts]}
+    for start in range(0, n_boot, chunk):
+        k = min(chunk, n_boot - start)
+        deltas['runs'][start:start+k] = _poisson_deltas(rng, runs, k)
+        for p, c in counts.items():
+            deltas[p][start:start+k] = baseruns(c + _poisson_deltas(rng, c, k)) - base[p]
+    # more runs means less WAR, so the upper run quantile gives the lower WAR bound
+    q = [(1 - level)/2, (1 + level)/2]
+    result = {}
+    for war, source in interval_sources.items():
+        lo, hi = np.quantile(deltas[source], q, axis=0)
+        result[war+'_minus'], result[war+'_plus'] = hi/rpw, -lo/rpw
+    return pd.DataFrame(result, index=season.index)
+
+
+def pitcher_seasons(pitch, stuff):
+    '''Runs, outs and both pitch models' event counts per pitcher-season.'''
+    keys  = ['pitcher', 'game_year']
+    pitch = pitch.drop(columns='pitch_team').groupby(keys).sum()
+    stuff = stuff.drop(columns=['pitch_team', 'runs', 'is_out']).groupby(keys).sum()
+    return pitch.join(stuff).reset_index().rename(columns={'pitcher': 'mlb_ID', 'game_year': 'year_ID'})
+
+
+def war_intervals(seasons, n_boot=1000, seed=0, workers=None, chunk=250):
+    '''How far below (``<war>_minus``) and above (``<war>_plus``) each WAR the
+    ``level`` bootstrap interval reaches, for every row of ``pitcher_seasons``.'''
+    years = sorted(seasons.year_ID.unique())
+    seeds = np.random.SeedSequence(seed).spawn(len(years))
+    parts = [seasons[seasons.year_ID == year] for year in years]
+    rpws  = [runs_per_win(part.runs.sum(), part.is_out.sum()) for part in parts]
+    with ProcessPoolExecutor(workers or min(len(years), os.cpu_count())) as pool:
+        results = pool.map(_season_intervals, parts, rpws, [n_boot]*len(years), seeds, [chunk]*len(years))
+        intervals = pd.concat(list(results))
+    return pd.concat([seasons[['mlb_ID', 'year_ID']], intervals], axis=1)
+
+
+def main(argv):
+    seasons   = pitcher_seasons(storage.read_frame(data_path('pitch')), storage.read_frame(data_path('stuff')))
+    intervals = war_intervals(seasons)
+    widths    = {war: (intervals[war+'_minus'] + intervals[war+'_plus']).median() for war in interval_sources}
+    print(pd.Series(widths, name=f'median {level:.0%} interval width').round(2))
+    if '--write' in argv:
+        print(storage.write_frame(intervals, os.path.join(data_dir, 'war_intervals'+storage.extension),
+                                  source='bootstrap.py'))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
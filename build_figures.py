@@ -0,0 +1,36 @@
+'''Prebuilds the static analysis charts as Plotly JSON specs.
+
+The app loads these specs once per process instead of building the figures on
+every rerun. Rerun this whenever the descriptiveness frames change:
+
+    $ python build_figures.py
+'''
+import os
+import plots
+from war_data import figure_dir, load_xera_descriptiveness, load_rv_vs_bsr_descriptiveness
+
+
+figures = {
+    'xera_descriptiveness':
+        lambda: plots.descriptiveness_figure(load_xera_descriptiveness(),
+                                             [0.1, 0.1, 1.0, 1.0, 0.1, 0.1],
+                                             'Correlation to ERA or RA9'),
+    'rv_vs_bsr_descriptiveness':
+        lambda: plots.descriptiveness_figure(load_rv_vs_bsr_descriptiveness(),
+                                             [1.0, 1.0, 1.0, 1.0, 0.1, 0.1],
+                                             'Correlation to RA9'),
+}
+
+
+def write_figure(name):
+    path = os.path.join(figure_dir, name+'.json')
+    os.makedirs(figure_dir, exist_ok=True)
+    with open(path+'.tmp', 'w') as f:
+        f.write(figures[name]().to_json())
+    os.replace(path+'.tmp', path)
+    return path
+
+
+if __name__ == '__main__':
+    for name in figures:
+        print(write_figure(name))
@@ -0,0 +1,63 @@
+'''Pitchers' WARs combined over a range of seasons.
+
+Every pitcher's WARs are laid out on a (pitcher, season) grid and summed
+cumulatively over the seasons once, at load. The totals over seasons first..last
+are then one subtraction of two grid columns for every pitcher, whatever the range.
+The teams of every season are kept too, so a range can be filtered by any team a
+pitcher played for in it.
+'''
+import numpy as np, pandas as pd
+
+
+class Careers:
+    def __init__(self, wars, war_names, id_col='mlb_ID'):
+        self.war_names = war_names
+        pitcher, self.pitchers = pd.factorize(wars[id_col])
+        year, self.years = pd.factorize(wars.Year, sort=True)
+        self._pitcher, self._year, self._teams = pitcher, year, wars.Team.to_numpy()
+        n, m = len(self.pitchers), len(self.years)
+
+        grid = np.zeros((n, m, len(war_names)))
+        grid[pitcher, year] = wars[war_names].to_numpy(dtype=float)
+        seasons = np.zeros((n, m))
+        seasons[pitcher, year] = 1
+        # prefix sums with a leading zero season, so a range is [last+1] - [first]
+        self._wars    = np.concatenate([np.zeros((n, 1, len(war_names))), grid.cumsum(axis=1)], axis=1)
+        self._seasons = np.concatenate([np.zeros((n, 1)), seasons.cumsum(axis=1)], axis=1)
+
+        # row of each pitcher's latest season up to each season, for his name, age and team
+        latest = np.full((n, m), -1)
+        latest[pitcher, year] = np.arange(len(wars))
+        self._latest = np.maximum.accumulate(latest, axis=1)
+        self._rows   = wars[['Name', 'Age', 'Team']].reset_index(drop=True)
+
+    def _span(self, first, last):
+        # the range's grid columns, and its active pitchers sorted by their xBaseRuns total
+        i, j = self.years.get_loc(first), self.years.get_loc(last) + 1
+        seasons = self._seasons[:, j] - self._seasons[:, i]
+        active  = np.flatnonzero(seasons > 0)
+        totals  = self._wars[active, j] - self._wars[active, i]
+        order   = pd.Series(totals[:, self.war_names.index('xBaseRuns')]).sort_values(
+                      ascending=False, kind='stable').index.to_numpy()
+        return i, j, active[order], seasons[active[order]], totals[order]
+
+    def span(self, first, last):
+        '''One row per pitcher who pitched between seasons ``first`` and ``last``,
+        with his WARs summed over them, and the Average and StdDev of the sums.
+        Name, Age and Team are from his latest season in the range.'''
+        i, j, active, seasons, totals = self._span(first, last)
+        frame = self._rows.iloc[self._latest[active, j-1]].reset_index(drop=True)
+        frame.insert(1, 'Year', f'{first}' if first == last else f'{first}-{last}')
+        frame.insert(2, 'Seasons', seasons.astype(np.int16))
+        frame[self.war_names] = totals
+        frame['Average'] = totals.mean(axis=1)
+        frame['StdDev']  = totals.std(axis=1, ddof=1)
+        return frame
+
+    def teams(self, first, last):
+        '''Every team of every row of ``span(first, last)``, indexed by row position.'''
+        i, j, active, _, _ = self._span(first, last)
+        position = np.full(len(self.pitchers), -1)
+        position[active] = np.arange(len(active))
+        in_range = (self._year >= i) & (self._year < j)
+        return pd.Series(self._teams[in_range], index=position[self._pitcher[in_range]])
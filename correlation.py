@@ -0,0 +1,49 @@
+'''Correlations between the WARs under the leaderboard's filters.
+
+Sums, sums of squares and cross-products of the WAR columns are precomputed per
+(year, team, innings bucket) cell. A filtered correlation matrix is then a sum
+over the selected cells instead of a pass over every pitcher-season.
+'''
+import numpy as np, pandas as pd
+
+
+# the minimum innings thresholds offered, each is the lower edge of a bucket
+ip_thresholds = np.array([0, 1, 5, 10, 20, 30, 40, 50, 60, 80, 100, 120, 150, 180])
+
+
+class CorrelationStats:
+    def __init__(self, wars, years, teams, ip):
+        wars = np.asarray(wars, dtype=float)
+        year_codes, self.years = pd.factorize(pd.Series(years), sort=True)
+        team_codes, self.teams = pd.factorize(pd.Series(teams))
+        ip_codes = np.searchsorted(ip_thresholds, np.nan_to_num(ip), side='right') - 1
+        shape = (len(self.years), len(self.teams), len(ip_thresholds))
+        cells = np.ravel_multi_index((year_codes, team_codes, ip_codes), shape)
+        n_cells, n_wars = np.prod(shape), wars.shape[1]
+
+        cross = (wars[:,:,None]*wars[:,None,:]).reshape(len(wars), -1)
+        stats = np.column_stack([np.ones(len(wars)), wars, cross])
+        sums  = np.stack([np.bincount(cells, col, n_cells) for col in stats.T], axis=-1)
+        # cumulative from the top bucket down, so bucket k holds every row with ip >= threshold k
+        self._stats = sums.reshape(*shape, -1)[:,:,::-1].cumsum(axis=2)[:,:,::-1]
+        self.n_wars = n_wars
+
+    def corr(self, years=None, teams=None, min_ip=0):
+        '''Correlation matrix of the WARs over the rows in ``years`` and ``teams``
+        (all when None) with at least ``min_ip`` innings.'''
+        stats = self._stats
+        if years is not None:
+            stats = stats[np.flatnonzero(self.years.isin(years))]
+        if teams is not None:
+            stats = stats[:,np.flatnonzero(self.teams.isin(teams))]
+        k = np.searchsorted(ip_thresholds, min_ip, side='right') - 1
+        total = stats[:,:,k].sum(axis=(0,1))
+
+        n, m = total[0], self.n_wars
+        if n < 2:
+            return np.full((m, m), np.nan)
+        mean = total[1:m+1]/n
+        cov  = total[m+1:].reshape(m, m)/n - np.outer(mean, mean)
+        sd   = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return cov/np.outer(sd, sd)
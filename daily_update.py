@@ -0,0 +1,215 @@
+'''In-season daily refresh of the WAR data files.
+
+A day's data is one row per pitcher-game with
+
+    mlb_ID, year_ID, team_ID, game_pk, name_common, age, PF_pit,
+    the additive run and playing time columns in ``run_columns``,
+    and the BaseRuns event counts with no prefix (real), x, pi and st prefixes
+
+The running per pitcher-season-team sums are kept in ``season_aggregates.arrow``.
+Its metadata holds the league's runs, team games and replacement level, and the
+days already added. The shipped data files don't hold the sums, so they are
+seeded once from every pitcher-game so far of the seasons to be updated, and
+each season's replacement runs per out. Updates refuse to run until then.
+
+A day is added to the pitcher-seasons it touches. The season's BaseRuns
+estimates and WAR inputs are rebuilt from the sums, and only that season goes
+through ``WarPipeline``. The WARs of a pitcher's stints with several teams are
+summed into one ``<n>TM`` row, as in ``final_wars``. Earlier seasons are left
+alone. A season is only replaced when its sums cover every pitcher it already
+has, so a partial aggregate can't drop rows.
+
+Every file is swapped in atomically. The sums go first, with the day recorded
+in them, so they can never hold a day twice. The WAR files follow, and then
+``last_updated.json`` is stamped with the day. An update that died after the
+sums were written is finished by rerunning it: the WARs are rebuilt from the
+sums without adding the day again. A day that is already in the stamp, or in
+the seeded history, is skipped, so rerunning an update is harmless.
+
+    $ python daily_update.py --seed history.arrow 2025-05-31 2025=0.151
+    $ python daily_update.py day.arrow 2025-06-01
+'''
+import os, sys, json, datetime
+import numpy as np, pandas as pd
+import storage
+from storage import data_dir, data_path
+from baseruns import events, baseruns, counts_from_frame
+from war_calc import WarPipeline, input_columns, league_columns, war_columns
+
+
+key_columns  = ['mlb_ID', 'year_ID', 'team_ID']
+run_columns  = ['xRA', 'RP_adj', 'ExIn_adj', 'RA', 'R_def', 'PosR_def', 'FRV', 'Framing',
+                'ifFIPR', 'TBF', 'outs', 'G', 'LI_adj']
+# prefix of each variant's event counts, for the BaseRuns input column it feeds
+count_prefixes = {'BsR': '', 'xBsR': 'x', 'piBsR': 'pi', 'stBsR': 'st'}
+count_columns  = [p+e for p in count_prefixes.values() for e in events]
+
+stamp_name = 'last_updated.json'
+
+
+def _aggregates_path(directory):
+    return os.path.join(directory, 'season_aggregates'+storage.extension)
+
+
+def read_state(directory=data_dir):
+    '''The season sums, the league totals indexed by year, and the days in the sums
+    ({'seeded': ISO date the seeded history runs through, 'ingested': [ISO dates]}).'''
+    path = _aggregates_path(directory)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'{path} has to be seeded first, see `python daily_update.py --seed`')
+    meta   = storage.read_metadata(path)
+    league = pd.DataFrame.from_dict(meta['league'], orient='index', columns=league_columns, dtype=float)
+    league.index = league.index.astype(int)
+    return storage.read_frame(path), league, {'seeded': meta['seeded'], 'ingested': meta['ingested']}
+
+
+def _write_state(aggregates, league, days, directory, source):
+    # the league and the days go in the same file as the sums, so all three change in one step
+    league = {str(year): row.tolist() for year, row in league[league_columns].iterrows()}
+    storage.write_frame(aggregates, _aggregates_path(directory), source, {'league': league, **days})
+
+
+def read_stamp(directory=data_dir):
+    '''The last-updated stamp: {'date': ISO date, 'ingested': [ISO dates]}.'''
+    path = os.path.join(directory, stamp_name)
+    if not os.path.exists(path):
+        return {'date': None, 'ingested': []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_stamp(stamp, directory):
+    path = os.path.join(directory, stamp_name)
+    tmp  = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(stamp, f, indent=1)
+    os.replace(tmp, path)
+
+
+def aggregate_day(day):
+    '''One row of sums per pitcher-season-team in ``day``.'''
+    day = day.assign(PF_TBF=day.PF_pit*day.TBF)
+    sums  = day.groupby(key_columns)[run_columns + ['PF_TBF'] + count_columns].sum()
+    names = day.groupby(key_columns)[['name_common', 'age']].last()
+    return names.join(sums)
+
+
+def update_aggregates(aggregates, day):
+    '''``aggregates`` with the day's sums added to the pitcher-seasons it touches.'''
+    sums = aggregate_day(day)
+    aggregates = aggregates.set_index(key_columns)
+    numeric = sums.columns.drop(['name_common', 'age'])
+    merged  = aggregates.reindex(aggregates.index.union(sums.index))
+    merged[numeric] = merged[numeric].fillna(0).add(sums[numeric].reindex(merged.index, fill_value=0))
+    merged.update(sums[['name_common', 'age']])
+    return merged.reset_index()
+
+
+def update_league(league, day):
+    '''``league`` (indexed by year) with the day's runs and team games added.
+    A new season carries the previous season's replacement level.'''
+    for year, games in day.groupby('year_ID'):
+        if year not in league.index:
+            league.loc[year] = [0, 0, league.sort_index().rep_rpo.iloc[-1] if len(league) else np.nan]
+        league.loc[year, 'R_lg'] += games.RA.sum()
+        league.loc[year, 'G_lg'] += games[['team_ID', 'game_pk']].drop_duplicates().shape[0]
+    return league
+
+
+def season_inputs(aggregates):
+    '''The ``war_calc`` inputs of every pitcher-season in ``aggregates``.'''
+    inputs = aggregates[key_columns + run_columns].rename(columns={'year_ID': 'year'})
+    inputs['PF_pit'] = np.divide(aggregates.PF_TBF, aggregates.TBF,
+                                 out=np.ones(len(aggregates)), where=aggregates.TBF > 0)
+    for column, prefix in count_prefixes.items():
+        # real BaseRuns uses the real outs, the expected variants their counted outs
+        outs = aggregates.outs.to_numpy(dtype=float) if prefix == '' else None
+        inputs[column] = baseruns(counts_from_frame(aggregates, prefix), outs=outs)
+    return inputs
+
+
+def collapse_teams(season_wars):
+    '''One row per pitcher-season, as in ``final_wars``: the WARs of a pitcher's
+    stints with several teams are summed under the team ``<n>TM``.'''
+    grouped = season_wars.groupby(['mlb_ID', 'year_ID'], sort=False)
+    rows    = grouped[['name_common', 'age']].last()
+    teams   = grouped.team_ID.agg(['last', 'size'])
+    rows['team_ID'] = teams['last'].where(teams['size'] == 1, teams['size'].astype(str) + 'TM')
+    return rows.join(grouped[war_columns].sum(min_count=1)).reset_index()
+
+
+def seed(history, through, rep_rpo, directory=data_dir):
+    '''Start the season sums and league totals from ``history``, every pitcher-game
+    of the seasons to be updated through the day ``through``, shaped like a day.
+    ``rep_rpo`` maps each of those seasons to its replacement runs per out.'''
+    missing = set(history.year_ID.unique()) - set(rep_rpo)
+    if missing:
+        raise ValueError(f'no replacement level given for {sorted(missing)}')
+    league = update_league(pd.DataFrame(columns=league_columns, dtype=float), history)
+    league['rep_rpo'] = league.index.map(rep_rpo).astype(float)
+    _write_state(aggregate_day(history).reset_index(), league, {'seeded': through, 'ingested': []},
+                 directory, f'daily_update.py --seed {through}')
+
+
+def update(day, date, pipeline=None, directory=data_dir):
+    '''Ingest one day and rewrite the season sums and both WAR files. Returns the
+    season's new WARs, or None if ``date`` was already ingested. Nothing is
+    written if the day can't be ingested.'''
+    stamp = read_stamp(directory)
+    if date in stamp['ingested']:
+        return None
+    aggregates, league, days = read_state(directory)
+    if date <= days['seeded']:
+        return None
+    final = storage.read_frame(data_path('final_wars', directory))
+    years = day.year_ID.unique()
+    # a day already in the sums is from an update that died before stamping, which is finished here
+    resumed = date in days['ingested']
+    if not resumed:
+        unseeded = set(final.year_ID[final.year_ID.isin(years)]) - set(aggregates.year_ID)
+        if unseeded:
+            raise ValueError(f'the season sums were never seeded for {sorted(unseeded)}')
+        aggregates = update_aggregates(aggregates, day)
+        league     = update_league(league, day)
+    if league.rep_rpo.loc[years].isna().any():
+        raise ValueError(f'no replacement level for {sorted(years)}, seed the league first')
+
+    season = aggregates[aggregates.year_ID.isin(years)].reset_index(drop=True)
+    wars   = (pipeline or WarPipeline()).run(season_inputs(season)[input_columns], league)
+    season_wars = collapse_teams(pd.concat([season[['mlb_ID', 'year_ID', 'name_common', 'age', 'team_ID']],
+                                            wars], axis=1))
+
+    # a season is only replaced by sums that still hold every pitcher it had
+    old_keys = final.loc[final.year_ID.isin(years), ['mlb_ID', 'year_ID']]
+    dropped  = old_keys.merge(season_wars[['mlb_ID', 'year_ID']], how='left', indicator=True)._merge == 'left_only'
+    if dropped.any():
+        raise ValueError(f'the season sums are missing {dropped.sum()} pitcher-seasons of final_wars')
+    final = pd.concat([final[~final.year_ID.isin(years)], season_wars[final.columns]], ignore_index=True)
+    corr  = final[['mlb_ID', 'year_ID'] + war_columns]
+
+    source = f'daily_update.py {date}'
+    if not resumed:
+        _write_state(aggregates, league, {**days, 'ingested': sorted(days['ingested'] + [date])},
+                     directory, source)
+    storage.write_frame(corr, os.path.join(directory, 'wars_for_correlation'+storage.extension), source)
+    storage.write_frame(final, os.path.join(directory, 'final_wars'+storage.extension), source)
+    _write_stamp({**stamp, 'date': max(date, stamp['date'] or date),
+                  'ingested': sorted(stamp['ingested'] + [date])}, directory)
+    return season_wars
+
+
+def main(argv):
+    if argv[:1] == ['--seed']:
+        path, through, *levels = argv[1:]
+        rep_rpo = {int(year): float(value) for year, value in (level.split('=') for level in levels)}
+        seed(storage.read_frame(path), through, rep_rpo)
+        print(f'seeded through {through}')
+        return
+    path = argv[0]
+    date = argv[1] if len(argv) > 1 else datetime.date.today().isoformat()
+    result = update(storage.read_frame(path), date)
+    print(f'{date} already ingested' if result is None else f'{date}: {len(result)} pitcher-seasons updated')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,158 @@
+'''Second stage of the framing model: a logistic GLMM fit by the Laplace approximation.
+
+Every taken pitch has the first stage's called-strike probability (the CatBoost
+model), used as an offset, plus fixed effects (batter/pitcher handedness, count)
+and random intercepts for the pitcher, catcher and batter:
+
+    logit P(called strike) = logit(p_stage1) + X·beta + Z·u,   u_g ~ N(0, sigma_g^2)
+
+X and Z are sparse, so a fit needs memory proportional to the number of pitches
+plus the number of players. For fixed sigmas the mode of (beta, u) is found by
+Newton steps on the penalized likelihood, each solving the sparse Hessian system
+by sparse LU or conjugate gradients. The sigmas maximize the Laplace
+approximation of the marginal likelihood. Passing the previous ``FramingFit`` as
+``start`` warm starts both, so a nightly refit with a few more pitches only
+takes a handful of Newton steps.
+
+``framing_runs`` turns a fit into the ``pit_framing_runs`` frame: the called
+strikes each pitcher's catchers added, at 0.125 runs per called strike.
+'''
+from collections import namedtuple
+import numpy as np, pandas as pd, scipy.sparse as sp
+from scipy.sparse.linalg import splu, cg
+from scipy.optimize import minimize
+from scipy.special import expit, logit
+
+
+runs_per_strike = 0.125
+fixed_columns   = ['stand', 'p_throws', 'balls', 'strikes']
+random_columns  = ['pitcher', 'catcher', 'batter']
+
+FramingFit = namedtuple('FramingFit', ['beta', 'effects', 'sigmas', 'objective', 'newton_steps'])
+
+
+def _one_hot(codes, n):
+    return sp.csr_matrix((np.ones(len(codes)), (np.arange(len(codes)), codes)), shape=(len(codes), n))
+
+
+def design(taken, fixed=fixed_columns, random=random_columns):
+    '''The sparse fixed-effect and random-effect design matrices of ``taken``, and
+    the names of their columns.
+
+    Each fixed column is dummy coded against its first level next to an
+    intercept. The random blocks are one-hot per level, in the order of ``random``.
+    '''
+    blocks, names = [sp.csr_matrix(np.ones((len(taken), 1)))], ['Intercept']
+    for col in fixed:
+        codes, levels = pd.factorize(taken[col], sort=True)
+        blocks.append(_one_hot(codes, len(levels))[:,1:])
+        names += [f'{col}={level}' for level in levels[1:]]
+    X = sp.hstack(blocks, format='csr')
+
+    blocks, levels = [], {}
+    for col in random:
+        codes, levels[col] = pd.factorize(taken[col], sort=True)
+        blocks.append(_one_hot(codes, len(levels[col])))
+    return X, sp.hstack(blocks, format='csr'), pd.Index(names), levels
+
+
+def _solve(H, g, solver):
+    if solver == 'cg':
+        # Jacobi preconditioner, the Hessian is diagonally dominant in the random effects
+        M = sp.diags(1/H.diagonal())
+        step, _ = cg(H, g, M=M, rtol=1e-10, maxiter=1000)
+        return step
+    return splu(H.tocsc()).solve(g)
+
+
+def _mode(A, y, offset, precision, theta, solver, tol=1e-6, max_steps=50):
+    # Newton's method on the penalized log-likelihood, halving any step that doesn't improve it
+    penalized = lambda eta, th: (y*eta - np.logaddexp(0, eta)).sum() - 0.5*(precision*th*th).sum()
+    eta  = offset + A @ theta
+    best = penalized(eta, theta)
+    for step_no in range(1, max_steps+1):
+        p = expit(eta)
+        g = A.T @ (y - p) - precision*theta
+        H = (A.T @ sp.diags(p*(1 - p)) @ A + sp.diags(precision)).tocsr()
+        step = _solve(H, g, solver)
+        for _ in range(30):
+            new_eta = offset + A @ (theta + step)
+            value   = penalized(new_eta, theta + step)
+            if value >= best - 1e-12:
+                break
+            step = step/2
+        theta, eta, best = theta + step, new_eta, value
+        if np.max(np.abs(step)) < tol:
+            break
+    p = expit(eta)
+    H = (A.T @ sp.diags(p*(1 - p)) @ A + sp.diags(precision)).tocsc()
+    return theta, best, H, step_no
+
+
+def _logdet(H):
+    # log|H| from the U factor of a sparse LU, H is symmetric positive definite
+    return np.log(np.abs(splu(H).U.diagonal())).sum()
+
+
+def fit_framing(taken, prob_col='cs_prob', strike_col='called_strike', fixed=fixed_columns,
+                random=random_columns, start=None, solver='cg', max_evals=60):
+    '''Fit the framing GLMM to the taken pitches.
+
+    ``prob_col`` is the first-stage called-strike probability and ``strike_col``
+    is 1 for a called strike and 0 for a ball. ``start`` is a previous fit to
+    warm start from. Effects of players new since that fit start at 0.
+    '''
+    X, Z, fixed_names, levels = design(taken, fixed, random)
+    A = sp.hstack([X, Z], format='csr')
+    y = taken[strike_col].to_numpy(dtype=float)
+    offset = logit(np.clip(taken[prob_col].to_numpy(dtype=float), 1e-6, 1 - 1e-6))
+    sizes  = np.array([len(levels[col]) for col in random])
+    # fixed effects get a negligible ridge so the Hessian stays invertible
+    fixed_precision = np.full(X.shape[1], 1e-8)
+
+    if start is None:
+        theta = np.zeros(A.shape[1])
+        log_sigmas = np.log(np.full(len(random), 0.1))
+    else:
+        theta = np.concatenate([start.beta.reindex(fixed_names, fill_value=0).to_numpy()]
+                               + [start.effects[col].reindex(levels[col], fill_value=0).to_numpy()
+                                  for col in random])
+        log_sigmas = np.log(start.sigmas.reindex(random).to_numpy())
+
+    state = {'theta': theta, 'steps': 0}
+    def objective(log_sigmas):
+        precision = np.concatenate([fixed_precision, np.repeat(np.exp(-2*log_sigmas), sizes)])
+        theta, value, H, steps = _mode(A, y, offset, precision, state['theta'], solver)
+        # each evaluation starts from the last mode, which is close for nearby sigmas
+        state.update(theta=theta, steps=state['steps'] + steps)
+        log_prior_det = (sizes*(-2*log_sigmas)).sum()
+        return -value + 0.5*(_logdet(H) - log_prior_det)
+
+    # a warm start only searches a small neighbourhood of the previous sigmas
+    simplex = log_sigmas + np.vstack([np.zeros(len(random)), np.eye(len(random))])*(0.5 if start is None else 0.05)
+    result  = minimize(objective, log_sigmas, method='Nelder-Mead',
+                       options={'maxfev': max_evals, 'xatol': 0.01, 'fatol': 0.01, 'initial_simplex': simplex})
+    objective(result.x)
+    theta = state['theta']
+    split = np.cumsum(np.concatenate([[X.shape[1]], sizes]))[:-1]
+    parts = np.split(theta, split)
+    return FramingFit(beta=pd.Series(parts[0], index=fixed_names),
+                      effects={col: pd.Series(u, index=levels[col]) for col, u in zip(random, parts[1:])},
+                      sigmas=pd.Series(np.exp(result.x), index=random),
+                      objective=result.fun, newton_steps=state['steps'])
+
+
+def framing_runs(taken, fit, prob_col='cs_prob', fixed=fixed_columns, random=random_columns,
+                 effect='catcher', by=('pitcher', 'game_year', 'pitch_team')):
+    '''Called strikes added by the ``effect`` players (the catchers) on each
+    group's taken pitches, and the runs they're worth.'''
+    X, Z, fixed_names, levels = design(taken, fixed, random)
+    u   = np.concatenate([fit.effects[col].reindex(levels[col], fill_value=0).to_numpy() for col in random])
+    eta = (logit(np.clip(taken[prob_col].to_numpy(dtype=float), 1e-6, 1 - 1e-6))
+           + X @ fit.beta.reindex(fixed_names, fill_value=0).to_numpy() + Z @ u)
+    # the same pitches with an average ``effect`` player
+    own  = np.repeat([col == effect for col in random], [len(levels[col]) for col in random])
+    diff = pd.Series(expit(eta) - expit(eta - Z @ (u*own)), index=taken.index, name='called_strike_diff')
+    frame = diff.groupby([taken[c] for c in by]).sum().reset_index()
+    frame['framing_runs'] = frame.called_strike_diff*runs_per_strike
+    return frame
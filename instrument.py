@@ -0,0 +1,96 @@
+'''Named timing and allocation spans around the sections of the app.
+
+Off by default. Profiling is turned on with the ``WAR_SPECTRUM_PROFILE``
+environment variable or a ``?profile=1`` query parameter. Setting the variable
+to ``memory`` instead of ``1`` also traces allocations with ``tracemalloc``.
+That slows every rerun of every session down a lot, so a query parameter can't
+turn it on.
+
+With profiling on, every span is logged as a JSON line to the
+``war_spectrum.spans`` logger, and ``report`` shows the spans of the run in the
+sidebar. Fragments rerun without the rest of the script, so their spans are
+kept and shown apart by ``section``. With profiling off, ``span`` hands back a
+shared no-op context manager.
+'''
+import os, sys, json, time, logging, tracemalloc, contextlib
+import pandas as pd, streamlit as st
+
+
+logger    = logging.getLogger('war_spectrum.spans')
+modes     = ('1', 'memory')
+_disabled = contextlib.nullcontext()
+
+
+def _mode():
+    mode = os.environ.get('WAR_SPECTRUM_PROFILE')
+    if mode in modes:
+        return mode
+    # any visitor can set the query parameter, so it only ever turns on the timings
+    return '1' if st.query_params.get('profile') in modes else None
+
+
+def start():
+    '''Decide whether this run is profiled. Call once at the top of the script.'''
+    mode = st.session_state['_profile'] = _mode()
+    if mode is None:
+        return
+    st.session_state['_spans']   = {'app': []}
+    st.session_state['_section'] = 'app'
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    if mode == 'memory' and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+@contextlib.contextmanager
+def _span(name, memory):
+    if memory:
+        # peaks of nested spans reset their parent's, so only leaf spans have exact peaks
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = {'span': name, 'ms': round(1000*(time.perf_counter() - begin), 2)}
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            record.update(alloc_kb=round((current - before)/1024, 1), peak_kb=round((peak - before)/1024, 1))
+        st.session_state['_spans'][st.session_state['_section']].append(record)
+        logger.info(json.dumps({'section': st.session_state['_section'], **record}))
+
+
+def span(name):
+    '''Context manager timing the code inside it as the span ``name``.'''
+    mode = st.session_state.get('_profile')
+    return _disabled if mode is None else _span(name, mode == 'memory')
+
+
+@contextlib.contextmanager
+def section(name):
+    '''Keep the spans inside it apart as ``name`` and show them where it ends.
+    Use it around a fragment's body, whose reruns skip ``start`` and ``report``.'''
+    if st.session_state.get('_profile') is None:
+        yield
+        return
+    outer = st.session_state['_section']
+    st.session_state['_spans'][name] = []
+    st.session_state['_section']     = name
+    try:
+        yield
+    finally:
+        st.session_state['_section'] = outer
+    with st.expander(f'{name.capitalize()} timings'):
+        st.dataframe(pd.DataFrame(st.session_state['_spans'][name]), hide_index=True)
+
+
+def report():
+    '''Show the spans of this run outside any section in the sidebar. Call at the
+    end of the script.'''
+    if st.session_state.get('_profile') is None:
+        return
+    with st.sidebar.expander('Section timings', expanded=True):
+        st.dataframe(pd.DataFrame(st.session_state['_spans']['app']), hide_index=True)
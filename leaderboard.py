@@ -0,0 +1,195 @@
+'''Server-side row model for the WAR leaderboard.
+
+The leaderboard frame is sorted, filtered and paged here, so the grid only ever
+receives the window of rows being looked at.
+'''
+import unicodedata, bisect, functools
+from collections import defaultdict
+import numpy as np, pandas as pd
+
+
+class Leaderboard:
+    '''The leaderboard frame plus the indexes used to serve windows of it.
+
+    Sort orders are computed once per column and direction and reused for every
+    filter, so serving a window costs a mask lookup rather than a sort. Each year
+    and team has a precomputed bitmap of its rows, so any combination of the
+    year/team filters is a union and intersection of a few packed bitmaps. The
+    WARs are also kept as a float32 matrix, so a custom blend of them over every
+    row is a single matrix-vector product, and the names are indexed for search
+    (see ``NameIndex``).
+
+    A row is on the teams in ``teams`` when given, team labels indexed by row
+    position with possibly several per row, and on its ``Team`` otherwise.
+    '''
+    def __init__(self, frame, war_names, teams=None):
+        self.frame   = frame
+        self._orders = {}
+        self.war_matrix = np.ascontiguousarray(frame[war_names].to_numpy(dtype=np.float32))
+        year_codes, self.years = pd.factorize(frame.Year, sort=True)
+        teams = frame.Team.reset_index(drop=True) if teams is None else teams
+        team_codes, self.teams = pd.factorize(teams)
+        self._year_bitmaps = _bitmaps(year_codes, len(self.years), len(frame))
+        self._team_bitmaps = _bitmaps(team_codes, len(self.teams), len(frame), teams.index.to_numpy())
+        self.names = NameIndex(frame.Name)
+
+    def __len__(self):
+        return self.frame.shape[0]
+
+    def order(self, column, ascending=False):
+        '''Row positions of the whole frame sorted by ``column``, missing values last.'''
+        key = (column, ascending)
+        if key not in self._orders:
+            values = self.frame[column].reset_index(drop=True)
+            self._orders[key] = values.sort_values(ascending=ascending, kind='stable',
+                                                   na_position='last').index.to_numpy()
+        return self._orders[key]
+
+    def blend(self, weights):
+        '''Weighted average of the WARs of every row, with ``weights`` in ``war_names`` order.'''
+        weights = np.asarray(weights, dtype=np.float32)
+        total   = weights.sum()
+        if total == 0:
+            return np.full(len(self), np.nan, dtype=np.float32)
+        return self.war_matrix @ (weights/total)
+
+    def _union(self, levels, bitmaps, selected):
+        selected = np.flatnonzero(levels.isin(selected))
+        if len(selected) == len(levels):
+            return None
+        return np.bitwise_or.reduce(bitmaps[selected], axis=0)
+
+    def filter_mask(self, years, teams):
+        '''Boolean mask of the rows in any of ``years`` and any of ``teams``.'''
+        year_bits = self._union(self.years, self._year_bitmaps, years)
+        team_bits = self._union(self.teams, self._team_bitmaps, teams)
+        if year_bits is None and team_bits is None:
+            return np.ones(len(self), dtype=bool)
+        if year_bits is None or team_bits is None:
+            bits = team_bits if year_bits is None else year_bits
+        else:
+            bits = year_bits & team_bits
+        return np.unpackbits(bits, count=len(self)).view(bool)
+
+    def range_mask(self, column, low=None, high=None, values=None):
+        '''Boolean mask of the rows whose ``column``, or ``values`` when given, is
+        between ``low`` and ``high`` (either None for no bound). Missing values
+        are outside any bounded range.'''
+        values = self.frame[column].to_numpy(dtype=float) if values is None else np.asarray(values, dtype=float)
+        mask   = np.ones(len(self), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return mask
+
+    def name_mask(self, query):
+        '''Rows whose name matches ``query``, ignoring case and accents (see ``NameIndex``).'''
+        return self.names.mask(query)
+
+    def rows(self, mask=None, sort_by='xBaseRuns', ascending=False, values=None):
+        '''Sorted positions of the rows selected by the boolean ``mask``.
+
+        Sorts by the column ``sort_by``, or by ``values`` (one per row of the
+        frame) when they are given, as for a custom blend.
+        '''
+        if values is None:
+            order = self.order(sort_by, ascending)
+        else:
+            order = pd.Series(values).sort_values(ascending=ascending, kind='stable',
+                                                  na_position='last').index.to_numpy()
+        if mask is None:
+            return order
+        return order[np.asarray(mask)[order]]
+
+    def window(self, rows, page=0, page_size=1000, **columns):
+        '''A copy of the ``page``-th window of ``rows``, safe to hand to the grid.
+        Extra ``columns`` given as one value per row of the frame are added to it.'''
+        start  = page*page_size
+        window = rows[start:start+page_size]
+        frame  = self.frame.iloc[window].reset_index(drop=True)
+        # the grid would be sent every category of the whole frame otherwise
+        frame  = frame.astype({c: str for c, t in frame.dtypes.items() if isinstance(t, pd.CategoricalDtype)})
+        for name, values in columns.items():
+            frame[name] = values[window]
+        return frame
+
+
+def normalize(text):
+    '''``text`` casefolded and with its accents stripped, so that Martínez is martinez.'''
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c)).casefold()
+
+
+class NameIndex:
+    '''Accent and case insensitive search over the names of a frame's rows.
+
+    Each distinct name is normalized once. A query of three or more characters
+    matches the names containing it: the names holding all of its trigrams are
+    looked up in the trigram postings and only those few are checked. A shorter
+    query matches the names with a word starting with it, found by bisecting the
+    sorted words of every name.
+    '''
+    def __init__(self, names):
+        codes, uniques = pd.factorize(names)
+        # missing names get the code -1, which picks the always empty last slot of a match
+        self._codes = codes
+        self._names = [normalize(str(name)) for name in uniques]
+        postings = defaultdict(list)
+        for i, name in enumerate(self._names):
+            for gram in {name[j:j+3] for j in range(len(name) - 2)}:
+                postings[gram].append(i)
+        self._postings = {gram: np.array(ids) for gram, ids in postings.items()}
+        words = sorted((word, i) for i, name in enumerate(self._names) for word in name.split())
+        self._words    = [word for word, _ in words]
+        self._word_ids = np.array([i for _, i in words], dtype=int)
+
+    def matches(self, query):
+        '''Codes of the distinct names matching ``query``.'''
+        query = normalize(query.strip())
+        if len(query) < 3:
+            start = bisect.bisect_left(self._words, query)
+            stop  = bisect.bisect_left(self._words, query + '\U0010ffff', start)
+            return np.unique(self._word_ids[start:stop])
+        grams = {query[j:j+3] for j in range(len(query) - 2)}
+        if not grams <= self._postings.keys():
+            return np.array([], dtype=int)
+        candidates = functools.reduce(np.intersect1d, sorted((self._postings[g] for g in grams), key=len))
+        return np.array([i for i in candidates if query in self._names[i]], dtype=int)
+
+    def mask(self, query):
+        '''Boolean mask of the rows whose name matches ``query``.'''
+        matched = np.zeros(len(self._names) + 1, dtype=bool)
+        matched[self.matches(query)] = True
+        return matched[self._codes]
+
+
+def grid_frame(window, decimals=1):
+    '''``window`` compacted for sending to the grid, which only shows ``decimals``
+    places: floats become nullable int16 counts of 10**-``decimals`` (decoded in
+    the grid by ``scaled_getter``), and teams a dictionary of the teams on the page.'''
+    scale  = 10**decimals
+    floats = [c for c, t in window.dtypes.items() if pd.api.types.is_float_dtype(t)]
+    frame  = window.astype({'Team': 'category'})
+    for col in floats:
+        frame[col] = (window[col]*scale).round().astype('Int16')
+    return frame
+
+
+def scaled_getter(decimals=1):
+    '''The grid's valueGetter source for a column sent by ``grid_frame``.'''
+    return ('function(p){var v = p.data[p.colDef.field];'
+            f' return v == null ? null : v/{10**decimals}}}')
+
+
+def _bitmaps(codes, n_levels, n_rows, rows=None):
+    # one row of packed bits per level, with bit i set when row i (row ``rows[k]`` for
+    # code k) has that level. Missing values get the code -1, which sets bits in an
+    # extra last slot that is dropped
+    masks = np.zeros((n_levels + 1, n_rows), dtype=bool)
+    masks[codes, np.arange(n_rows) if rows is None else rows] = True
+    return np.packbits(masks[:-1], axis=1)
+
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
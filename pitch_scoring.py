@@ -0,0 +1,124 @@
+'''Batch scoring of pitch-level data with the Pitching+ / Stuff+ sub-models.
+
+Pitches are streamed from an Arrow IPC or Parquet file in chunks. Each chunk is
+routed to one of the five sub-models by pitch class and by whether the pitch is
+the pitcher's primary pitch that season:
+
+    primary_fast, primary_slow, secondary_fast, secondary_slow, secondary_bend
+
+Scoring runs across a process pool. Every worker sums its chunk's outcome
+probabilities per pitcher-season before handing them back, so only small
+aggregates cross process boundaries and at most ``max_pending`` chunks are in
+memory at once. The result has one row per pitcher-season-team with the
+expected count of every outcome, e.g. ``piS``, ``piHR``, ``piBIPOut``, ready
+for ``baseruns.counts_from_frame`` once the expected strikeouts, walks and
+basepath events are joined on.
+
+A model is any object with ``predict_proba(features) -> (n, len(outcomes))``,
+giving the probability of each of ``outcomes`` for every pitch. The models are
+pickled to a file as a {sub-model name: model} dict and loaded once per worker.
+'''
+import os, pickle
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np, pandas as pd, pyarrow as pa, pyarrow.parquet as pq
+
+
+outcomes  = ['Ball', 'CStrike', 'Whiff', 'Foul', 'HBP', 'S', 'D', 'T', 'HR', 'BIPOut', 'SF', 'GIDP']
+submodels = ['primary_fast', 'primary_slow', 'secondary_fast', 'secondary_slow', 'secondary_bend']
+season_keys = ['pitcher', 'game_year', 'pitch_team']
+
+pitch_classes = {'FF': 'fast', 'SI': 'fast', 'FC': 'fast',
+                 'CH': 'slow', 'FS': 'slow', 'SC': 'slow',
+                 'CU': 'bend', 'SL': 'bend', 'ST': 'bend', 'KC': 'bend', 'SV': 'bend',
+                 'KN': 'bend', 'EP': 'bend', 'FO': 'bend', 'CS': 'bend'}
+# cutters slower than this are slow cutters, which bend
+slow_cutter_mph = 85.0
+
+
+def iter_chunks(path, columns=None, chunk_size=100_000):
+    '''DataFrames of at most ``chunk_size`` pitches from an Arrow IPC or Parquet file.'''
+    if path.endswith('.parquet'):
+        for batch in pq.ParquetFile(path).iter_batches(chunk_size, columns=columns):
+            yield batch.to_pandas()
+        return
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            table = pa.Table.from_batches([reader.get_batch(i)])
+            table = table if columns is None else table.select(columns)
+            for start in range(0, table.num_rows, chunk_size):
+                yield table.slice(start, chunk_size).to_pandas()
+
+
+def classify(chunk):
+    '''Pitch class of every pitch: fast, slow or bend.'''
+    cls = chunk.pitch_type.map(pitch_classes).fillna('bend').to_numpy(dtype=object)
+    slow_cutter = (chunk.pitch_type == 'FC').to_numpy() & (chunk.release_speed < slow_cutter_mph).to_numpy()
+    cls[slow_cutter] = 'bend'
+    return cls
+
+
+def primary_pitches(path, chunk_size=100_000):
+    '''Most thrown pitch class of every pitcher-season, from a first pass over the file.'''
+    usage = []
+    for chunk in iter_chunks(path, ['pitcher', 'game_year', 'pitch_type', 'release_speed'], chunk_size):
+        chunk = chunk.assign(cls=classify(chunk))
+        usage.append(chunk.groupby(['pitcher', 'game_year', 'cls']).size())
+    usage = pd.concat(usage).groupby(level=[0, 1, 2]).sum()
+    return usage.groupby(level=[0, 1]).idxmax().map(lambda key: key[2]).rename('primary')
+
+
+def route(chunk, primary):
+    '''Sub-model name of every pitch.'''
+    cls = classify(chunk)
+    key = pd.MultiIndex.from_arrays([chunk.pitcher, chunk.game_year])
+    is_primary = cls == primary.reindex(key).to_numpy(dtype=object)
+    routed = np.where(is_primary, 'primary_' + cls, 'secondary_' + cls).astype(object)
+    routed[routed == 'primary_bend'] = 'primary_slow'
+    return routed
+
+
+_models = None
+
+
+def _load_models(models_path):
+    global _models
+    with open(models_path, 'rb') as f:
+        _models = pickle.load(f)
+
+
+def _score_chunk(chunk, primary, features, prefix):
+    probs  = np.zeros((len(chunk), len(outcomes)))
+    routed = route(chunk, primary)
+    for name in submodels:
+        rows = np.flatnonzero(routed == name)
+        if len(rows):
+            probs[rows] = _models[name].predict_proba(chunk.iloc[rows][features])
+    scored = pd.DataFrame(probs, columns=[prefix+o for o in outcomes], index=chunk.index)
+    scored[prefix+'Pitches'] = 1
+    return scored.join(chunk[season_keys]).groupby(season_keys).sum()
+
+
+def score(path, models_path, features, prefix='pi', chunk_size=100_000, workers=None,
+          max_pending=None, primary=None):
+    '''Expected outcome counts per pitcher-season-team for every pitch in ``path``.
+
+    ``features`` are the model input columns, ``prefix`` names the output
+    columns ('pi' for Pitching+, 'st' for Stuff+). ``primary`` is the output of
+    ``primary_pitches``, computed with an extra pass over the file if not given.
+    '''
+    workers     = workers or os.cpu_count()
+    max_pending = max_pending or 2*workers
+    primary     = primary_pitches(path, chunk_size) if primary is None else primary
+    columns     = list(dict.fromkeys(season_keys + ['pitch_type', 'release_speed'] + list(features)))
+
+    totals, pending = [], set()
+    with ProcessPoolExecutor(workers, initializer=_load_models, initargs=(models_path,)) as pool:
+        for chunk in iter_chunks(path, columns, chunk_size):
+            if len(pending) >= max_pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                totals.extend(f.result() for f in finished)
+            pending.add(pool.submit(_score_chunk, chunk, primary, list(features), prefix))
+        totals.extend(f.result() for f in wait(pending)[0])
+    # a pitcher-season can span chunks, so the partial sums are summed again
+    return pd.concat(totals).groupby(level=season_keys).sum().reset_index()
@@ -0,0 +1,82 @@
+'''Plotly figures for the app.'''
+import numpy as np, plotly.graph_objects as go, plotly.express as px
+
+
+# up to this many selected rows get their own trace and legend entry
+legend_limit = 20
+band_percentiles = [5, 25, 50, 75, 95]
+
+
+def _labels(selected):
+    return (selected['Name'].astype(str) + ' ' + selected['Year'].astype(str)).to_numpy()
+
+
+def _line_traces(values, labels, errors=None):
+    n, m = values.shape
+    x = np.arange(m)
+    if n <= legend_limit:
+        error_y = lambda i: None if errors is None else {'type': 'data', 'arrayminus': errors[0][i],
+                                                          'array': errors[1][i], 'thickness': 1}
+        return [go.Scattergl(x=x, y=y, mode='lines+markers', name=label, error_y=error_y(i))
+                for i, (y, label) in enumerate(zip(values, labels))]
+    # every spectrum in one WebGL trace, separated by gaps
+    xs = np.tile(np.append(x, np.nan), n)
+    ys = np.column_stack([values, np.full(n, np.nan)]).ravel()
+    text = np.repeat(labels, m+1)
+    return [go.Scattergl(x=xs, y=ys, text=text, mode='lines+markers', opacity=0.4,
+                         marker={'size': 4}, line={'width': 1}, connectgaps=False,
+                         hovertemplate='%{text}<br>%{y:.1f}<extra></extra>', showlegend=False)]
+
+
+def _band_traces(values):
+    lo_out, lo, median, hi, hi_out = np.nanpercentile(values, band_percentiles, axis=0)
+    x = np.arange(values.shape[1])
+    band = lambda y, name, fill=None, opacity=0: go.Scatter(
+        x=x, y=y, name=name, mode='lines', fill=fill, line={'width': 0},
+        fillcolor=f'rgba(99,110,250,{opacity})', showlegend=fill is not None)
+    return [band(lo_out, None), band(hi_out, '5th-95th percentile', 'tonexty', 0.2),
+            band(lo, None), band(hi, '25th-75th percentile', 'tonexty', 0.4),
+            go.Scatter(x=x, y=median, name='Median', mode='lines+markers')]
+
+
+def selection_figure(selected, war_names, bands=False, errors=None):
+    '''Line plot of the WAR spectra of the ``selected`` rows, or their percentile
+    bands when ``bands`` is True.
+
+    ``errors`` are how far below and above each value its error bar reaches, as
+    two arrays shaped like the values. They're drawn while every row has its own trace.
+    '''
+    values = selected[war_names].to_numpy(dtype=float)
+    title  = ' '.join(_labels(selected)) if values.shape[0] == 1 else ''
+    if bands or values.shape[0] > legend_limit:
+        errors = None
+    lo, hi = (values, values) if errors is None else (values - np.nan_to_num(errors[0]),
+                                                      values + np.nan_to_num(errors[1]))
+    f = go.Figure(_band_traces(values) if bands else _line_traces(values, _labels(selected), errors))
+    f.update_layout(xaxis = {'tickmode': 'array',
+                             'tickvals': np.arange(len(war_names)),
+                             'ticktext': war_names},
+                    yaxis_range = [min(0,np.nanmin(lo)),np.nanmax(hi)+0.1],
+                    title = title)
+    return f
+
+
+def descriptiveness_figure(descr_df, alphas, title):
+    '''Correlation of each estimator column of ``descr_df`` to RA9 by years into the future.'''
+    stats = descr_df.columns.values[1:-1]
+    f = go.Figure([go.Scatter(x=descr_df['Years into the Future'],y=descr_df[stat],
+                              mode='lines',name=stat,opacity=alpha)
+                   for stat,alpha in zip(stats,alphas)])
+    f.update_layout(xaxis ={'tick0': 0, 'dtick':    1, 'range': [0,3]},
+                    yaxis ={'tick0': 0, 'dtick': 0.25, 'range': [0,1]},
+                    title=title)
+    return f
+
+
+def correlation_figure(corr):
+    '''Heatmap of the lower triangle of the correlation matrix ``corr``.'''
+    mask = np.triu(np.ones_like(corr,dtype=bool),k=1)
+    f = px.imshow(np.round(corr.mask(mask),2),text_auto=True)
+    f.update_layout(title_text="Correlation Matrix",
+                    title_x=0.5)
+    return f
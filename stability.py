@@ -0,0 +1,117 @@
+'''Year-over-year descriptiveness and reliability of run estimators.
+
+For lags k = 0..max_lag these are the weighted correlations between an
+estimator in season t and
+
+- descriptiveness: the target (RA9 by default) in season t+k
+- reliability:     the same estimator in season t+k
+
+which is what the ``*_descr_df`` and ``*_relia_df`` frames hold. All lags come
+from a single self-join of the pitcher-seasons on pitcher ID. Each pair of
+seasons is weighted by the smaller of their innings. That is this engine's
+choice: the weighting behind the shipped frames isn't recorded.
+
+Only the pitch-model frames can be recomputed from the shipped data, and not
+exactly. Their RA9 comes from the pitch frames' runs, and the results differ
+from the shipped ``rv_vs_bsr_descr_df`` by up to 0.05 (0.563 against 0.607 for
+strv9 at lag 0). They differ from ``rv_vs_bsr_relia_df`` by up to 0.035. The
+``xera_*``, ``descriptiveness_df`` and ``reliability_df`` frames can't be
+regenerated at all, because the shipped data has no actual RA9, xERA, K%, or
+real and x BaseRuns per pitcher-season.
+
+So ``--write`` never touches the frames behind the published charts. It writes
+``*_recomputed.arrow`` files next to them, to compare or swap in by hand.
+
+The frames are cached per process, keyed on a digest of the pitcher-seasons and
+the arguments, so asking again for the same estimators skips the self-join.
+
+    $ python stability.py          # print the pitch-model frames and their gap to the shipped ones
+    $ python stability.py --write  # and write rv_vs_bsr_*_df_recomputed.arrow
+'''
+import os, sys
+import numpy as np, pandas as pd
+import storage
+from storage import data_dir, data_path
+
+
+def _season_pairs(seasons, id_col, year_col, max_lag):
+    pairs = seasons.merge(seasons, on=id_col, suffixes=('', '_future'))
+    lag   = pairs[year_col+'_future'] - pairs[year_col]
+    return pairs[(lag >= 0) & (lag <= max_lag)], lag[(lag >= 0) & (lag <= max_lag)].to_numpy()
+
+
+def _weighted_corr(x, y, w, lag, n_lags):
+    # weighted Pearson correlation of every column of x with y (same shape), per lag
+    # a lag without any pairs is NaN
+    sw  = np.bincount(lag, w, n_lags)[:,None]
+    agg = lambda v: np.stack([np.bincount(lag, w*col, n_lags) for col in v.T], axis=1)/sw
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mx, my = agg(x), agg(y)
+        cov = agg(x*y) - mx*my
+        return cov/np.sqrt((agg(x*x) - mx*mx)*(agg(y*y) - my*my))
+
+
+_cache = {}
+
+
+def _digest(seasons, columns):
+    # the correlations don't depend on the row order, so neither does the digest
+    return len(seasons), int(pd.util.hash_pandas_object(seasons[columns], index=False).sum())
+
+
+def lagged_correlations(seasons, estimators, target='ra9', id_col='pitcher', year_col='year',
+                        weight_col='ip', max_lag=3):
+    '''Descriptiveness and reliability frames of ``estimators`` for lags 0..``max_lag``.
+
+    ``seasons`` has one row per pitcher-season. Each pair of seasons is weighted
+    by the smaller of the two seasons' ``weight_col``, which doesn't reproduce
+    the shipped frames exactly (see above).
+    '''
+    estimators = list(estimators)
+    columns = list(dict.fromkeys([id_col, year_col, weight_col, target] + estimators))
+    key = (_digest(seasons, columns), tuple(estimators), target, id_col, year_col, weight_col, max_lag)
+    if key not in _cache:
+        _cache[key] = _lagged_correlations(seasons, estimators, target, id_col, year_col, weight_col, max_lag)
+    return tuple(frame.copy() for frame in _cache[key])
+
+
+def _lagged_correlations(seasons, estimators, target, id_col, year_col, weight_col, max_lag):
+    pairs, lag = _season_pairs(seasons, id_col, year_col, max_lag)
+    n_lags = max_lag + 1
+    w   = np.minimum(pairs[weight_col], pairs[weight_col+'_future']).to_numpy(dtype=float)
+    now = pairs[estimators].to_numpy(dtype=float)
+    future_target = np.repeat(pairs[[target+'_future']].to_numpy(dtype=float), len(estimators), axis=1)
+    future_est    = pairs[[e+'_future' for e in estimators]].to_numpy(dtype=float)
+
+    frame = lambda corr: pd.DataFrame({'year': np.arange(n_lags), **dict(zip(estimators, corr.T))})
+    return (frame(_weighted_corr(now, future_target, w, lag, n_lags)),
+            frame(_weighted_corr(now, future_est, w, lag, n_lags)))
+
+
+def pitch_model_seasons(pitch, stuff):
+    '''Per-nine rates of the pitch-model frames, one row per pitcher-season.'''
+    keys  = ['pitcher', 'game_year']
+    pitch = pitch.groupby(keys)[['runs', 'is_out', 'piBsR', 'pirv']].sum()
+    stuff = stuff.groupby(keys)[['stBsR', 'strv']].sum()
+    seasons = pitch.join(stuff).reset_index().rename(columns={'game_year': 'year'})
+    per_nine = 27/seasons.is_out.where(seasons.is_out > 0)
+    return pd.DataFrame({'pitcher': seasons.pitcher, 'year': seasons.year, 'ip': seasons.is_out/3,
+                         'ra9': seasons.runs*per_nine, 'pirv9': seasons.pirv*per_nine,
+                         'strv9': seasons.strv*per_nine, 'pibsra9': seasons.piBsR*per_nine,
+                         'stbsra9': seasons.stBsR*per_nine}).dropna()
+
+
+def main(argv):
+    seasons = pitch_model_seasons(storage.read_frame(data_path('pitch')), storage.read_frame(data_path('stuff')))
+    descr, relia = lagged_correlations(seasons, ['strv9', 'pirv9', 'pibsra9', 'stbsra9'])
+    for frame, name in [(descr, 'rv_vs_bsr_descr_df'), (relia, 'rv_vs_bsr_relia_df')]:
+        shipped = storage.read_frame(data_path(name))
+        print(frame, f'largest difference from {name}: {(frame - shipped[frame.columns]).abs().max().max():.3f}',
+              sep='\n', end='\n\n')
+        if '--write' in argv:
+            print(storage.write_frame(frame, os.path.join(data_dir, name+'_recomputed'+storage.extension),
+                                      source='stability.py'))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,147 @@
+'''Columnar storage for the app's data files.
+
+Frames are stored as uncompressed Arrow IPC files so they can be memory-mapped
+and only the requested columns are materialised. Each file carries a format
+version and its column schema in the Arrow schema metadata, which are checked
+on every read.
+
+Convert the pickles shipped with the app by running
+
+    $ python storage.py            # every *.pickle next to this file
+    $ python storage.py a.pickle   # or just the ones given
+
+An Arrow file that was written by anything but the conversion of its pickle,
+e.g. by a daily update, is newer than the pickle and is left alone unless
+``--force`` is given.
+'''
+import os, sys, json, glob
+import pandas as pd, pyarrow as pa, pyarrow.feather as feather
+
+
+format_version = 1
+extension      = '.arrow'
+data_dir       = os.path.dirname(os.path.abspath(__file__))
+
+_version_key = b'war_spectrum.format_version'
+_schema_key  = b'war_spectrum.schema'
+_source_key  = b'war_spectrum.source'
+_extra_key   = b'war_spectrum.metadata'
+
+
+def _coerce_objects(frame):
+    # some of the model outputs were pickled as object columns of floats
+    frame = frame.copy()
+    for col in frame.columns[frame.dtypes == object]:
+        try:
+            frame[col] = pd.to_numeric(frame[col])
+        except (TypeError, ValueError):
+            pass
+    return frame
+
+
+def write_frame(frame, path, source=None, metadata=None):
+    '''Write ``frame`` to ``path`` as a stamped Arrow IPC file, atomically, with
+    ``metadata`` (anything JSON can hold) swapped in along with it.'''
+    frame  = _coerce_objects(frame)
+    table  = pa.Table.from_pandas(frame, preserve_index=False)
+    schema = {field.name: str(field.type) for field in table.schema}
+    metadata = {**(table.schema.metadata or {}),
+                _version_key: str(format_version).encode(),
+                _schema_key:  json.dumps(schema).encode(),
+                _source_key:  (source or '').encode(),
+                _extra_key:   json.dumps(metadata or {}).encode()}
+    table = table.replace_schema_metadata(metadata)
+    tmp = path + '.tmp'
+    feather.write_feather(table, tmp, compression='uncompressed')
+    os.replace(tmp, path)
+    return path
+
+
+def _stamp(path):
+    return _check_version(path, feather.read_table(path, columns=[], memory_map=True).schema.metadata)
+
+
+def read_schema(path):
+    '''The column -> Arrow type mapping stamped into ``path``.'''
+    return json.loads(_stamp(path)[_schema_key])
+
+
+def read_metadata(path):
+    '''The ``metadata`` written along with the frame in ``path``.'''
+    return json.loads(_stamp(path).get(_extra_key, b'{}'))
+
+
+def read_source(path):
+    '''What wrote ``path``: a pickle's name for a conversion, or a script's.'''
+    return _stamp(path)[_source_key].decode()
+
+
+def _check_version(path, metadata):
+    metadata = metadata or {}
+    if _version_key not in metadata:
+        raise ValueError(f'{path} is not a war spectrum data file (no format version)')
+    version = int(metadata[_version_key])
+    if version > format_version:
+        raise ValueError(f'{path} has format version {version}, '
+                         f'this version of the app reads up to {format_version}')
+    return metadata
+
+
+def _check_schema(path, table, columns):
+    stamped = json.loads(_check_version(path, table.schema.metadata)[_schema_key])
+    missing = [c for c in columns if c not in stamped]
+    if missing:
+        raise ValueError(f'{path} has no columns {missing}, its schema has {list(stamped)}')
+    changed = {field.name: (stamped.get(field.name), str(field.type)) for field in table.schema
+               if field.name in columns and stamped.get(field.name) != str(field.type)}
+    if changed:
+        raise ValueError(f'{path} does not match its stamped schema, (stamped, stored) types: {changed}')
+
+
+def read_frame(path, columns=None):
+    '''Read ``columns`` (all if None) of a data file into a DataFrame.
+
+    Arrow files are memory-mapped, so only the requested columns are read, and
+    they have to be in the file's stamped schema with the stamped types.
+    Pickles are still accepted, for files that haven't been converted yet.
+    '''
+    if path.endswith('.pickle'):
+        frame = pd.read_pickle(path)
+        return frame if columns is None else frame.loc[:,list(columns)]
+    table   = feather.read_table(path, memory_map=True)
+    columns = table.column_names if columns is None else list(columns)
+    _check_schema(path, table, columns)
+    return table.select(columns).to_pandas()
+
+
+def data_path(name, directory=data_dir):
+    '''Path of the data file ``name``, preferring its Arrow conversion to the pickle.'''
+    path = os.path.join(directory, name)
+    if os.path.exists(path + extension):
+        return path + extension
+    return path + '.pickle'
+
+
+def convert(pickle_path, force=False):
+    '''Write the Arrow file of ``pickle_path``. Refuses to replace one that has
+    been written since by anything else, unless ``force``.'''
+    path   = os.path.splitext(pickle_path)[0] + extension
+    source = os.path.basename(pickle_path)
+    if not force and os.path.exists(path) and read_source(path) != source:
+        raise FileExistsError(f'{path} was written by {read_source(path)!r} after the conversion of '
+                              f'{source}, pass --force to replace it')
+    return write_frame(pd.read_pickle(pickle_path), path, source=source)
+
+
+def main(argv):
+    force = '--force' in argv
+    paths = [a for a in argv if a != '--force'] or sorted(glob.glob(os.path.join(data_dir, '*.pickle')))
+    for pickle_path in paths:
+        try:
+            print(pickle_path, '->', convert(pickle_path, force))
+        except FileExistsError as e:
+            print('skipped:', e)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
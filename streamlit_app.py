@@ -1,26 +1,18 @@
-import streamlit as st, numpy as np, matplotlib.pyplot as plt, pandas as pd, plotly.express as px
-import plotly.graph_objects as go
-import plotly.figure_factory as ff
+import streamlit as st, numpy as np
 from st_aggrid import AgGrid
-from st_aggrid.grid_options_builder import GridOptionsBuilder
 from st_aggrid.shared import GridUpdateMode, JsCode
+from war_data import war_names, load_leaderboard, load_span_leaderboard, load_correlation_figure, load_figure
+from war_data import load_last_updated
+from war_data import interval_columns, interval_errors, interval_suffixes
+from leaderboard import page_count, grid_frame, scaled_getter
+from correlation import ip_thresholds
+from plots import selection_figure, legend_limit
+import instrument
 
 
-wars = pd.read_pickle('final_wars.pickle')
-
-wars.rename(columns={'name_common': 'Name', 'age': 'Age', 'year_ID':'Year', 'team_ID': 'Team',
-                     'ra_war': 'Runs Allowed', 'r_war': 'Baseball Reference',
-                     'oaa_war': 'OAA', 'bsr_war': 'BaseRuns', 'xbsr_war': 'xBaseRuns', 'fip_war': 'FIP',
-                     'pitch_war': 'Pitching+', 'stuff_war': 'Stuff+'}, inplace=True)
-
-war_names = ['Runs Allowed','Baseball Reference',
-             'OAA','BaseRuns','xBaseRuns','FIP',
-             'Pitching+','Stuff+']
-
-disp_wars = wars.loc[:,['Name','Year','Age','Team']+war_names]
-disp_wars.sort_values('xBaseRuns',ascending=False,ignore_index=True,inplace=True)
-disp_wars['Average']   = disp_wars.loc[:,war_names].mean(axis=1)
-disp_wars['StdDev']  = disp_wars.loc[:,war_names].std(axis=1)
+instrument.start()
+with instrument.span('load_leaderboard'):
+    leaderboard = load_leaderboard()
 
 st.set_page_config(layout="wide")
 
@@ -46,33 +38,37 @@ for them all, including an explanation for why I'm using BaseRuns rather than so
 (x)wOBA. After that there are some tables which show the correlations between all of these WARs and 
 explain the differences between them all :cherry_blossom:
 
-*Last Updated: 9/13/2024*
-
 ''')
+last_updated = load_last_updated()
+st.markdown(f'*Last Updated: {last_updated.month}/{last_updated.day}/{last_updated.year}*')
 
 
 css={'.ag-header-group-cell-label.ag-sticky-label': {'flex-direction': 'column', 'margin': 'auto',
                                                      'font-size': '12pt'}}
 
-columnDefs = [{'field': "Name", 'minWidth': 120, 'filter': True, 'sortable': False, 'pinned': 'left'},
-              {'field': "Year", 'minWidth':  70, 'filter': True, 'sortable': True,},
-              {'field': "Age",  'minWidth':  70, 'filter': True, 'sortable': True,  'suppressHeaderFilterButton': False},
-              {'field': "Team", 'minWidth':  70, 'filter': True, 'sortable': True, 'suppressHeaderFilterButton': False},
+# the WARs are sent as int16 tenths, see leaderboard.grid_frame
+scaled = JsCode(scaled_getter())
+
+# sorting and filtering are done on the server over every row, the grid only holds one page
+columnDefs = [{'field': "Name", 'minWidth': 120, 'pinned': 'left'},
+              {'field': "Year", 'minWidth':  70},
+              {'field': "Age",  'minWidth':  70},
+              {'field': "Team", 'minWidth':  70},
               {'headerName': "Runs Allowed",
                'headerTooltip': "Pitcher's runs allowed are used",
                'children': [{'field': 'Runs Allowed',
                              'minWidth': 130,
-                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1,
+                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1, 'valueGetter': scaled,
                              'headerTooltip': "Pitcher is responsible for all runs allowed",
                              'tooltipValueGetter': JsCode("""function(){return "Pitcher is responsible for all runs allowed"}""")},
                             {'field': 'Baseball Reference',
                              'minWidth': 150,
-                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1,
+                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1, 'valueGetter': scaled,
                              'headerTooltip': "Corrected for team's defence by DRS",
                              'tooltipValueGetter': JsCode("""function(){return "Corrected for team's defence"}""")},
                             {'field': 'OAA',
                              'minWidth': 80,
-                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1,
+                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1, 'valueGetter': scaled,
                              'headerTooltip': "Corrected using team OAA when pitcher is on the mound",
                              'tooltipValueGetter': JsCode("""function(){return "Corrected using team OAA when pitcher is on the mound"}""")},
                             ]},
@@ -80,41 +76,45 @@ columnDefs = [{'field': "Name", 'minWidth': 120, 'filter': True, 'sortable': Fal
                'headerTooltip': "A model which estimates a pitcher's runs allowed is used",
                'children': [{'field': 'BaseRuns',
                              'minWidth': 110,
-                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1,
+                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1, 'valueGetter': scaled,
                              'headerTooltip': "Like OAA-WAR, but with the pitcher's BaseRuns run estimate",
                              'tooltipValueGetter': JsCode("""function(){return "Like OAA-WAR but with the pitcher's BaseRuns run estimate"}""")},
                             {'field': 'xBaseRuns',
                              'minWidth': 110,
                              'headerName': 'xBaseRuns',
-                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1,
+                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1, 'valueGetter': scaled,
                              'headerTooltip': "Like BaseRuns-WAR, but the xERA-style xBaseRuns is used",
                              'tooltipValueGetter': JsCode("""function(){return "Like BaseRuns-WAR, but the xERA-style xBaseRuns is used"}""")},
                             {'field': 'FIP',
                              'minWidth': 80,
-                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1,
+                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1, 'valueGetter': scaled,
                              'headerTooltip': "rWAR-style but with FIP",
                              'tooltipValueGetter': JsCode("""function(){return "rWAR-style but with FIP"}""")},
                             ]},
               {'headerName': "Pitch Modelling",
                'headerTooltip': "A model which estimates a pitcher's runs allowed is used",
                'children': [{'field': 'Pitching+',
-                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1,
+                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1, 'valueGetter': scaled,
                              'headerTooltip': "Like BaseRuns-WAR, but uses Pitching+ style model for xBaseRuns",
                              'tooltipValueGetter': JsCode("""function(){return "Like BaseRuns-WAR, but uses Pitching+ style model for xBaseRuns"}""")},
                             {'field': 'Stuff+',
-                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1,
+                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1, 'valueGetter': scaled,
                              'headerTooltip': "Like BaseRuns-WAR, but uses Stuff+ style model for xBaseRuns",
                              'tooltipValueGetter': JsCode("""function(){return "Like BaseRuns-WAR, but uses Stuff+ style model for xBaseRuns"}""")},
                             ]},
               {'headerName': "Statistics",
                'headerTooltip': "Average and standard deviation of these WARs",
                'children': [{'field': 'Average',
-                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1},
+                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1, 'valueGetter': scaled},
                             {'field': 'StdDev',
-                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1} ]},
+                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1, 'valueGetter': scaled},
+                            {'field': 'Custom',
+                             'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1, 'valueGetter': scaled,
+                             'headerTooltip': "Your own blend of the WARs, weighted in the sidebar",
+                             'tooltipValueGetter': JsCode("""function(){return "Your own blend of the WARs, weighted in the sidebar"}""")} ]},
                ]
 
-gridOptions =  {'defaultColDef': {'flex': 1, 'minWidth': 120, 'filterable': True,
+gridOptions =  {'defaultColDef': {'flex': 1, 'minWidth': 120, 'sortable': False, 'filter': False,
 								  'groupable': False, 'editable': False, 
                                   'wrapText': True, 'autoHeight': True, 
                                   'suppressMovable': True,
@@ -131,60 +131,150 @@ gridOptions =  {'defaultColDef': {'flex': 1, 'minWidth': 120, 'filterable': True
                 'groupSelectsFiltered': True}
 
 st.markdown('''#### WAR Leaderboard
-You can filter columns on mobile by holding down the column header, or on desktop by clicking the menu button when 
-you hover over it :blush: This lets you, for example, limit the table to only select pitchers.
+You can filter the years, teams, ages and WARs in the dropdowns, search for pitchers by name, and sort by any column 
+with the controls above the table :blush: These work on every pitcher season, not just the page you're looking at.
 ''')
 
-left_col,right_col = st.columns(2)
-with left_col.expander('Included Years') :
-    years_select = st.multiselect("Included years", [2021,2022,2023,2024], [2024])
-with right_col.expander('Included Teams') :
-    teams_select = st.multiselect("Included Teams", disp_wars.Team.unique(), disp_wars.Team.unique(),
-                                    label_visibility='collapsed')
-
-year_filt = disp_wars.Year.isin(years_select)
-team_filt = disp_wars.Team.isin(teams_select)
-
-return_value = AgGrid(disp_wars[year_filt & team_filt], 
-       gridOptions=gridOptions,
-       update_mode=GridUpdateMode.SELECTION_CHANGED | GridUpdateMode.VALUE_CHANGED,
-       allow_unsafe_jscode=True,
-       fit_columns_on_grid_load=True,
-       height=700,
-       theme="streamlit",
-       key=None,
-       custom_css=css)
-
-st.markdown('''#### Selected Players WAR''')
-if return_value.selected_rows is None:
-    st.write('''Select rows in the table to see a line plot of their WARs''')
-else:
-    if return_value.selected_rows.shape[0] == 1:
-        row = return_value.selected_rows.iloc[0]
-        title = row['Name'] + ' ' + str(row['Year'])
+st.sidebar.markdown('''#### Custom WAR
+How much of each WAR's perspective do you buy? The weights are normalized, so the
+**Custom** column is a weighted average of the WARs you pick.
+''')
+blend_weights = [st.sidebar.slider(name, 0.0, 1.0, 1.0, 0.05) for name in war_names]
+
+
+def interval_widths(window):
+    minus, plus = interval_suffixes
+    return {'± '+name: (window[name+minus] + window[name+plus])/2
+            for name in war_names if name+minus in window}
+
+
+def interval_group(window):
+    return {'headerName': "90% Intervals",
+            'headerTooltip': "Half the width of the bootstrap interval of each WAR with one",
+            'children': [{'field': field, 'minWidth': 110, 'valueGetter': scaled,
+                          'type' : ['numericColumn', 'customNumericFormat'], 'precision': 1}
+                         for field in interval_widths(window)]}
+
+
+# combined seasons show the team of each pitcher's last season, but filter by all of them
+span_columnDefs = columnDefs[:2] + [{'field': "Seasons", 'minWidth': 70}, columnDefs[2],
+                                    dict(columnDefs[3], headerName="Last Team",
+                                         headerTooltip="The team filter keeps every team of the seasons")] \
+                  + columnDefs[4:]
+
+
+@st.fragment
+@instrument.section('leaderboard')
+def leaderboard_section(blend_weights):
+    left_col,mid_col,right_col = st.columns(3)
+    with left_col.expander('Included Years') :
+        years    = leaderboard.years.tolist()
+        combined = st.toggle("Combine each pitcher's seasons", False, key='combine_seasons')
+        if combined:
+            first, last  = st.select_slider('Seasons', years, (years[0], years[-1]), key='season_span')
+            years_select = [y for y in years if first <= y <= last]
+        else:
+            years_select = st.multiselect("Included years", years, years[-1:], key='years_select')
+    with right_col.expander('Included Teams') :
+        teams_select = st.multiselect("Included Teams", leaderboard.teams, leaderboard.teams, key='teams_select',
+                                        label_visibility='collapsed')
+    with mid_col.expander('Ages & WAR') :
+        age_bounds = int(leaderboard.frame.Age.min()), int(leaderboard.frame.Age.max())
+        age_range  = st.slider('Ages', *age_bounds, age_bounds, key='age_range')
+        war_col, min_col = st.columns(2)
+        min_war_by = war_col.selectbox('WAR', war_names + ['Custom'], war_names.index('xBaseRuns'), key='min_war_by')
+        min_war    = min_col.number_input('At least', value=None, step=0.5, placeholder='Any', key='min_war')
+    st.session_state['leaderboard_years'] = years_select
+
+    # combined seasons come from the per-pitcher prefix sums, one leaderboard per range
+    board = load_span_leaderboard(first, last) if combined else leaderboard
+    with instrument.span('custom_war'):
+        custom_war = board.blend(blend_weights)
+
+    # the correlation matrix follows these filters, so it needs a full rerun to catch up
+    filters = (combined, tuple(years_select), tuple(teams_select))
+    if st.session_state.get('corr_matrix') and st.session_state.get('leaderboard_filters', filters) != filters:
+        st.session_state['leaderboard_filters'] = filters
+        st.rerun(scope='app')
+    st.session_state['leaderboard_filters'] = filters
+
+    name_col,sort_col,order_col,size_col,page_col = st.columns([3,3,2,2,2])
+    name_query = name_col.text_input('Search names', '', key='name_query',
+                                     help="Accents and case don't matter, so sanchez finds Sánchez")
+    jump       = name_col.toggle('Jump to the matches instead of filtering', False, key='name_jump')
+    board_intervals = interval_columns(board.frame)
+    sort_options    = board.frame.columns.drop(board_intervals).tolist() + ['Custom']
+    sort_by    = sort_col.selectbox('Sort by', sort_options, sort_options.index('xBaseRuns'))
+    ascending  = order_col.selectbox('Order', ['Descending','Ascending']) == 'Ascending'
+    page_size  = size_col.selectbox('Rows per page', [100,250,500,1000], 3)
+
+    with instrument.span('leaderboard_rows'):
+        filt    = board.filter_mask(board.years if combined else years_select, teams_select)
+        matches = board.name_mask(name_query) if name_query else None
+        if matches is not None and not jump:
+            filt = filt & matches
+        if age_range != age_bounds:
+            filt = filt & board.range_mask('Age', *age_range)
+        if min_war is not None:
+            filt = filt & board.range_mask(min_war_by, min_war,
+                                           values=custom_war if min_war_by == 'Custom' else None)
+        rows  = board.rows(filt, sort_by, ascending, custom_war if sort_by == 'Custom' else None)
+        found = np.flatnonzero(matches[rows]) if matches is not None and jump else []
+    n_pages = page_count(len(rows), page_size)
+    # a new search turns to the page of its first match, after that the pages are free to change
+    search  = (name_query, jump)
+    if len(found) and st.session_state.get('leaderboard_search') != search:
+        st.session_state['page'] = int(found[0]//page_size) + 1
+    st.session_state['leaderboard_search'] = search
+    page    = page_col.number_input('Page', 1, n_pages, key='page', help=f'{n_pages} pages') - 1
+
+    show_intervals  = bool(board_intervals) and st.toggle('Show the 90% bootstrap intervals', False,
+                                                   help='Half the width of each interval, for the WARs that have one')
+    with instrument.span('grid'):
+        window = board.window(rows, page, page_size, Custom=custom_war)
+        grid   = window.drop(columns=board_intervals)
+        defs   = span_columnDefs if combined else columnDefs
+        if show_intervals:
+            grid = grid.assign(**interval_widths(window))
+            defs = defs + [interval_group(window)]
+        options = gridOptions if defs is columnDefs else dict(gridOptions, columnDefs=defs)
+        # the grid's row ids are the positions in the window, so the matches on this page start selected
+        on_page = [i - page*page_size for i in found if page*page_size <= i < (page + 1)*page_size]
+        if on_page:
+            options = dict(options, initialState={'rowSelection': [str(i) for i in on_page]})
+        return_value = AgGrid(grid_frame(grid), 
+               gridOptions=options,
+               update_mode=GridUpdateMode.SELECTION_CHANGED | GridUpdateMode.VALUE_CHANGED,
+               allow_unsafe_jscode=True,
+               fit_columns_on_grid_load=True,
+               height=700,
+               theme="streamlit",
+               key=None,
+               custom_css=css)
+
+    st.markdown('''#### Selected Players WAR''')
+    if return_value.selected_rows is None:
+        st.write('''Select rows in the table to see a line plot of their WARs''')
     else:
-        title = ''
-    f = go.Figure()
-    min_war = return_value.selected_rows[war_names].min().min()
-    max_war = return_value.selected_rows[war_names].max().max()
-    for ind,row in return_value.selected_rows.iterrows():
-        label = row['Name'] + ' ' + str(row['Year'])
-        f.add_trace(go.Scatter(x=np.arange(8),y=row[war_names].values,
-                               mode='lines+markers',name=label))
-    f.update_layout(xaxis = {'tickmode': 'array', 
-                             'tickvals': np.arange(8), 
-                             'ticktext': war_names},
-                    yaxis_range = [min(0,min_war),max_war+0.1],
-                    title = title)
-    st.plotly_chart(f,use_container_width=False,width=100)
+        # look the selected rows up by position, the grid only has their rounded values
+        selected = window.iloc[return_value.selected_rows.index.astype(int)]
+        bands    = False
+        if selected.shape[0] > legend_limit:
+            bands = st.toggle('Show percentile bands instead of every pitcher', True)
+        with instrument.span('selection_plot'):
+            f = selection_figure(selected, war_names, bands, interval_errors(selected))
+            st.plotly_chart(f,use_container_width=False,width=100)
+
+leaderboard_section(blend_weights)
 
 
 st.markdown('''#### Calculation Details''')
-raa_exp = st.expander('RAA Calculations for Each WAR')
-with raa_exp:
-    ra_tab, rw_tab, oa_tab, bs_tab, xb_tab, fi_tab, pi_tab, st_tab = st.tabs(war_names)
-    with ra_tab:
-        st.markdown(r'''
+raa_exp = st.expander('RAA Calculations for Each WAR', key='raa_exp', on_change='rerun')
+if raa_exp.open:
+    ra_tab, rw_tab, oa_tab, bs_tab, xb_tab, fi_tab, pi_tab, st_tab = raa_exp.tabs(war_names, key='raa_tabs',
+                                                                                  on_change='rerun')
+    if ra_tab.open:
+        ra_tab.markdown(r'''
 #### Runs Allowed RAA
 No corrections for park factors or defence. Corrections are still applied for relief
 pitchers, quality of opponents, and for extra-inning automatic runners.
@@ -198,8 +288,8 @@ $$
 - $\small\mathrm{lg_{adj}}$ is an adjustment to ensure the league's total RAA is $0$
 ''',unsafe_allow_html=True)
 
-    with rw_tab:
-        st.markdown(r'''
+    if rw_tab.open:
+        rw_tab.markdown(r'''
 #### Baseball Reference RAA
 I explain this one in more detail over in the 'Details of the WAR Calculation' dropdown, and obviously
 there's the [Baseball Reference pitcher WAR explainer](https://www.baseball-reference.com/about/war_explained_pitch.shtml).  
@@ -219,8 +309,8 @@ correction for the team's defence & positioning
 - $\small\mathrm{lg_{adj}}$ is an adjustment to ensure the league's total RAA is $0$
 ''')
 
-    with oa_tab:
-        st.markdown(r'''
+    if oa_tab.open:
+        oa_tab.markdown(r'''
 #### Baseball Reference but with OAA Defence RAA
 This is the same as Baseball Reference WAR but with the team DRS defensive correction replaced with
 the team's actual Fielding Run Value (FRV) while the pitcher is on the mound. The team positioning 
@@ -244,8 +334,8 @@ $$
 - $\small\mathrm{lg_{adj}}$ is an adjustment to ensure the league's total RAA is $0$
 ''')
 
-    with bs_tab:
-        st.markdown(r'''
+    if bs_tab.open:
+        bs_tab.markdown(r'''
 #### BaseRuns RAA
 This is the same as OAA WAR but with the pitcher's actual runs allowed replaced by the BaseRuns
 estimate for this runs allowed. 
@@ -271,8 +361,8 @@ $$
 - $\small\mathrm{lg_{adj}}$ is an adjustment to ensure the league's total RAA is $0$
 ''')
 
-    with xb_tab:
-        st.markdown(r'''
+    if xb_tab.open:
+        xb_tab.markdown(r'''
 #### xBaseRuns RAA
 I explain the xBaseRuns estimator over [here](#xbaseruns), but the purpose of using it here is to 
 control for the pitcher's sequencing luck **and** luck on batted balls.
@@ -291,8 +381,8 @@ $$
 - $\small\mathrm{lg_{adj}}$ is an adjustment to ensure the league's total RAA is $0$
 ''')
 
-    with fi_tab:
-        st.markdown(r'''
+    if fi_tab.open:
+        fi_tab.markdown(r'''
 #### FIP RAA
 This is not fWAR! It's rWAR with FIP!!
 
@@ -313,8 +403,8 @@ $$
 - $\small\mathrm{lg_{adj}}$ is an adjustment to ensure the league's total RAA is $0$
 ''')
 
-    with pi_tab:
-        st.markdown(r'''
+    if pi_tab.open:
+        pi_tab.markdown(r'''
 #### Pitching+ RAA
 This uses a Pitching+ style model to estimate the probability of each of the possible pitch
 outcomes for every pitch. These estimated probabilities are used in the xBaseRuns formula
@@ -364,8 +454,8 @@ season. 5 models were then made for each classification task (swing/take, whiff/
 
 ''')
 
-    with st_tab:
-        st.markdown(r'''
+    if st_tab.open:
+        st_tab.markdown(r'''
 #### Stuff+ RAA
 This is just like the Pitching+ RAA but with a Stuff+ model instead.
 
@@ -385,8 +475,9 @@ the location of the pitch removed, namely:
 Other than this, the model is exactly the same as the Pitching model.
 ''')
 
-baseruns_exp = st.expander('BaseRuns Run Estimator Explanation & Justification')
-baseruns_exp.markdown(r'''
+baseruns_exp = st.expander('BaseRuns Run Estimator Explanation & Justification', key='baseruns_exp', on_change='rerun')
+if baseruns_exp.open:
+    baseruns_exp.markdown(r'''
 #### BaseRuns Run Estimator
 The BaseRuns run estimator is a nonlinear run estimator which I have opted to use for estimating pitching
 runs allowed for two reasons: first because it allows a consistent method of estimating runs across all 
@@ -486,49 +577,17 @@ $\small x$-axis demonstrate the method's predictive quality of future runs allow
 are highlighted, demonstrating that xBaseRuns is capable of better describing current-year production 
 than xERA while maintaining the same predictability of future RA9.
 ''')
-xera_comp_df = pd.read_pickle('xera_descriptiveness_df.pickle')
-name_dict = {'ra9': 'RA9', 'bsra9': 'BaseRuns9', 
-             'xbsra9': 'xBaseRuns9', 'K%':'K%', 'pibsra9': 'Pitching+ BsR9',
-             'xERA': 'xERA', 'stbsra9': 'Stuff+ BsR9'}
-xera_comp_df.rename(columns=name_dict,inplace=True)
-war_columns = xera_comp_df.columns.values[1:].tolist()
-xera_comp_df['Years into the Future'] = np.arange(4)
-f = go.Figure()
-alphas = [0.1, 0.1, 1.0, 1.0, 0.1, 0.1]
-for i,stat in enumerate(war_columns):
-    f.add_trace(go.Scatter(x=np.arange(4),y=xera_comp_df[stat],
-                           mode='lines',name=stat,opacity=alphas[i]))
-f.update_layout(xaxis ={'tick0': 0, 'dtick':    1, 'range': [0,3]},
-                yaxis ={'tick0': 0, 'dtick': 0.25, 'range': [0,1]},
-                title='Correlation to ERA or RA9')
-
-baseruns_exp.plotly_chart(f,use_container_width=False,width=100)
-baseruns_exp.markdown(r'''
+    baseruns_exp.plotly_chart(load_figure('xera_descriptiveness'),use_container_width=False,width=100)
+    baseruns_exp.markdown(r'''
 I observed similar behavior with the pitch modelling approaches, but with more of a trade-off. 
 Using pi/stBaseRuns sacrifices some of the reliability and predictiveness of the pitch/stuff
 RV models for the sake of better descriptiveness. ''')
 
-pm_descr_df = pd.read_pickle('rv_vs_bsr_descr_df.pickle')
-name_dict = {'ra9': 'RA9', 'bsra9': 'BaseRuns9', 
-             'xbsra9': 'xBaseRuns9', 'K%':'K%', 'pibsra9': 'Pitching+ BsR9',
-             'xERA': 'xERA', 'stbsra9': 'Stuff+ BsR9', 'pirv9': 'Pitching+ RV9',
-             'strv9': 'Stuff+ RV9'}
-pm_descr_df.rename(columns=name_dict,inplace=True)
-war_columns = pm_descr_df.columns.values[1:].tolist()
-pm_descr_df['Years into the Future'] = np.arange(4)
-lss    = ['dotted','dotted','-','-','-.','dashed','dotted']
-alphas = [1.0, 1.0, 1.0, 1.0, 0.1, 0.1]
-f = go.Figure()
-for i,stat in enumerate(war_columns):
-    f.add_trace(go.Scatter(x=np.arange(4),y=pm_descr_df[stat],
-                           mode='lines',name=stat,opacity=alphas[i]))
-f.update_layout(xaxis ={'tick0': 0, 'dtick':    1, 'range': [0,3]},
-                yaxis ={'tick0': 0, 'dtick': 0.25, 'range': [0,1]},
-                title = 'Correlation to RA9')
-baseruns_exp.plotly_chart(f,use_container_width=False,width=100)
-
-war_exp = st.expander("Details of the WAR calculation &mdash; if you know how rWAR works you can skip this.")
-war_exp.markdown(r'''
+    baseruns_exp.plotly_chart(load_figure('rv_vs_bsr_descriptiveness'),use_container_width=False,width=100)
+
+war_exp = st.expander("Details of the WAR calculation &mdash; if you know how rWAR works you can skip this.", key='war_exp', on_change='rerun')
+if war_exp.open:
+    war_exp.markdown(r'''
 ##### If you already know how rWAR works this isn't for you
 
 For the sake of this exercise I think it's good to have a consistent WAR calculation methodology, and to that 
@@ -593,8 +652,9 @@ A final term, $\small\mathrm{LI_{adj}}$, is added to
 [correct for reliever chaining](http://tangotiger.com/index.php/site/comments/reliever-chaining-and-how-we-view-leverage). 
 
 ''')
-framing_exp = st.expander("Explanation of the framing correction model")
-framing_exp.markdown(r'''
+framing_exp = st.expander("Explanation of the framing correction model", key='framing_exp', on_change='rerun')
+if framing_exp.open:
+    framing_exp.markdown(r'''
 #### Catcher Framing
 Because pitchers also have an effect on catcher framing I opted to go for an approach which can control for that
 and give the pitcher the credit or discredit he deserves for that effect. For that, I opted to use a framing
@@ -621,23 +681,18 @@ is the best framer of the past few years. Sounds good.
 
 st.markdown('''#### Comparison of the WARs''')
 
-corr_matrix = st.expander("Correlation matrix between each of the WARs.")
-pitcher_years = pd.read_pickle('wars_for_correlation.pickle')
-war_columns = ['ra_war', 'r_war', 'oaa_war', 'bsr_war', 'xbsr_war', 'fip_war', 'pitch_war', 'stuff_war']
-name_fixer  = {v: war_names[i] for i,v in enumerate(war_columns)}
-pitcher_years.rename(columns=name_fixer,inplace=True)
-corr = pitcher_years[war_names].corr()
-mask = np.triu(np.ones_like(corr,dtype=bool),k=1)
-corr = corr.mask(mask)
-corr = np.round(corr,2)
-f = px.imshow(corr,text_auto=True)
-f.update_layout(title_text="Correlation Matrix",
-                title_x=0.5)
-corr_matrix.plotly_chart(f)
-
-
-resp_exp = st.expander("More details for what corrections are applied to each WAR.")
-resp_exp.markdown('''
+corr_matrix = st.expander("Correlation matrix between each of the WARs.", key='corr_matrix', on_change='rerun')
+if corr_matrix.open:
+    min_ip = corr_matrix.select_slider('Minimum innings pitched', ip_thresholds.tolist(), 0)
+    corr_matrix.caption('Only the pitcher seasons in the years and teams included in the leaderboard are used.')
+    with instrument.span('correlation_heatmap'):
+        corr_matrix.plotly_chart(load_correlation_figure(st.session_state.leaderboard_years,
+                                                          st.session_state.teams_select, min_ip))
+
+
+resp_exp = st.expander("More details for what corrections are applied to each WAR.", key='resp_exp', on_change='rerun')
+if resp_exp.open:
+    resp_exp.markdown('''
 ###### The Pitcher's Responsibility
 
 ✔️  indicates the pitcher is responsible for this thing, :x: indicates he is not, aka a correction for it has been applied. :warning: is intermediate in some way.
@@ -655,8 +710,9 @@ resp_exp.markdown('''
 
 ''')
 
-control_exp = st.expander("More details for what corrections are applied to each WAR.")
-control_exp.write('''
+control_exp = st.expander("More details for what corrections are applied to each WAR.", key='control_exp', on_change='rerun')
+if control_exp.open:
+    control_exp.write('''
 ##### Controls
 
 ✔️  indicates I'm controlling for this, :x: indicates I'm not.
@@ -673,3 +729,4 @@ control_exp.write('''
 | Stuff+             | :x: Stuff+ BaseRuns Estimate    | :x:              | :x:                       | :x:                           | :x:             | :x:          | ✔️                | :x:                        |
 ''')
 
+instrument.report()
@@ -0,0 +1,4 @@
+import os, sys
+
+# the app's modules live at the top of the repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
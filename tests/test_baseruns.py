@@ -0,0 +1,32 @@
+import numpy as np, pytest
+import storage
+from storage import data_path
+from baseruns import events, advancement, baseruns, baseruns_all, counts_from_frame
+
+
+@pytest.mark.parametrize('name, prefix', [('pitch', 'pi'), ('stuff', 'st')])
+def test_advancement_reproduces_the_stored_b_terms(name, prefix):
+    frame = storage.read_frame(data_path(name))
+    np.testing.assert_allclose(advancement(counts_from_frame(frame, prefix)), frame[prefix+'Bterm'], atol=1e-3)
+
+
+@pytest.mark.parametrize('name, prefix', [('pitch', 'pi'), ('stuff', 'st')])
+def test_baseruns_reproduces_the_stored_estimates(name, prefix):
+    frame = storage.read_frame(data_path(name))
+    np.testing.assert_allclose(baseruns(counts_from_frame(frame, prefix)), frame[prefix+'BsR'], atol=1e-4)
+
+
+def test_baseruns_by_hand():
+    counts = dict.fromkeys(events, 0.0)
+    counts.update(S=10, D=2, HR=1, BB=3, SO=8, BIPOut=10, SF=1, GIDP=2)
+    row = np.array([list(counts.values())])
+    A, B, C, D = 15, advancement(row)[0], 8 + 10 + 1 + 2*2, 1
+    np.testing.assert_allclose(baseruns(row), A*B/(B + C) + D)
+
+
+def test_baseruns_all_matches_each_variant():
+    rng    = np.random.default_rng(0)
+    counts = rng.integers(0, 50, size=(4, 20, len(events))).astype(float)
+    outs   = rng.integers(50, 200, size=20).astype(float)
+    expected = [baseruns(counts[0], outs=outs)] + [baseruns(c) for c in counts[1:]]
+    np.testing.assert_allclose(baseruns_all(counts, outs), expected)
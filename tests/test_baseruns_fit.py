@@ -0,0 +1,36 @@
+import numpy as np, pytest
+import storage
+from storage import data_path
+from baseruns import baseruns, counts_from_frame
+from baseruns_fit import fit_weights, bootstrap_weights
+
+
+@pytest.fixture(scope='module')
+def seasons():
+    pitch = storage.read_frame(data_path('pitch'))
+    return counts_from_frame(pitch, 'pi'), pitch.runs.to_numpy(dtype=float), pitch.is_out.to_numpy(dtype=float)/3
+
+
+def test_fit_lowers_the_rmse(seasons):
+    counts, runs, ip = seasons
+    default_rmse = np.sqrt((ip*(baseruns(counts) - runs)**2).sum()/ip.sum())
+    fit = fit_weights(counts, runs, ip)
+    assert fit.converged
+    assert fit.rmse < default_rmse
+    np.testing.assert_allclose(np.sqrt((ip*(baseruns(counts, fit.b) - runs)**2).sum()/ip.sum()), fit.rmse)
+
+
+def test_warm_start_converges_at_once(seasons):
+    counts, runs, ip = seasons
+    fit  = fit_weights(counts, runs, ip)
+    warm = fit_weights(counts, runs, ip, b0=fit.b)
+    assert warm.converged and warm.n_iter <= 2
+    np.testing.assert_allclose(warm.b, fit.b, atol=1e-4)
+
+
+def test_bootstrap_centres_on_the_fit(seasons):
+    counts, runs, ip = seasons
+    fit  = fit_weights(counts, runs, ip)
+    boot = bootstrap_weights(counts, runs, ip, n_boot=50, b0=fit.b, seed=0)
+    assert boot.shape == (50, len(fit.b))
+    assert (np.abs(np.median(boot, axis=0) - fit.b) < 3*boot.std(axis=0) + 1e-9).all()
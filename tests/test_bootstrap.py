@@ -0,0 +1,34 @@
+import numpy as np, pandas as pd, pytest
+import bootstrap
+from baseruns import events
+
+
+def test_runs_per_win_by_hand():
+    # a 162 game season allowing 700 runs: RPG = 2*27*700/4374 = 8.642, RPW = 2*8.642**0.715
+    assert bootstrap.runs_per_win(700, 162*27) == pytest.approx(9.3478, abs=1e-4)
+    # the classic ten runs per win at about 9.8 runs per game
+    assert bootstrap.runs_per_win(4.9, 27) == pytest.approx(10.2, abs=0.1)
+
+
+def season(scale):
+    '''Three pitcher-seasons of typical counts, times ``scale``.'''
+    per_season = dict(S=100, D=30, T=3, HR=20, BB=50, SF=5, GIDP=15, SO=150, BIPOut=300, SB=8, CS=3)
+    frame = pd.DataFrame({'runs': [70., 40., 90.]})
+    for prefix in ['pi', 'st']:
+        for event in events:
+            frame[prefix+event] = np.array([1., 0.6, 1.3])*per_season[event]
+    return frame*scale
+
+
+def test_interval_widths_are_nonnegative_and_shrink_with_more_data():
+    widths = []
+    for scale in [1, 4, 16]:
+        intervals = bootstrap._season_intervals(season(scale), 10.0, 2000, 0, 500)
+        assert (intervals >= 0).all().all()
+        widths.append(np.array([intervals[war+'_minus'] + intervals[war+'_plus']
+                                for war in bootstrap.interval_sources]))
+    # the Poisson spread grows like the square root of the counts, so relative to
+    # the counts the intervals shrink by about half every time the counts are quadrupled
+    for small, large in zip(widths, widths[1:]):
+        assert (large/4 < small*0.6).all()
+        np.testing.assert_allclose(large/small, 2, rtol=0.15)
@@ -0,0 +1,26 @@
+import numpy as np, pandas as pd
+from careers import Careers
+from leaderboard import Leaderboard
+
+
+war_names = ['xBaseRuns', 'FIP']
+
+
+def test_span_filters_by_every_team_of_the_range():
+    wars = pd.DataFrame({'mlb_ID': [1, 1, 1, 1, 2], 'Year': [2021, 2022, 2023, 2024, 2024],
+                         'Name': ['Al Able']*4 + ['Bo Baker'], 'Age': [26, 27, 28, 29, 30],
+                         'Team': ['NYY', 'NYY', 'NYY', 'LAD', 'NYY'],
+                         'xBaseRuns': [1.0, 2.0, 3.0, 4.0, 5.0], 'FIP': [1.0, 1.0, 1.0, 1.0, 2.0]})
+    careers = Careers(wars, war_names)
+    span    = careers.span(2021, 2024)
+    assert span.Name.tolist() == ['Al Able', 'Bo Baker']
+    assert span.Team.tolist() == ['LAD', 'NYY']
+    np.testing.assert_allclose(span.xBaseRuns, [10.0, 5.0])
+    assert span.Seasons.tolist() == [4, 1]
+
+    board = Leaderboard(span, war_names, careers.teams(2021, 2024))
+    assert board.filter_mask(board.years, ['NYY']).tolist() == [True, True]
+    assert board.filter_mask(board.years, ['LAD']).tolist() == [True, False]
+    later = Leaderboard(careers.span(2024, 2024), war_names, careers.teams(2024, 2024))
+    assert later.frame.Name.tolist() == ['Bo Baker', 'Al Able']
+    assert later.filter_mask(later.years, ['NYY']).tolist() == [True, False]
@@ -0,0 +1,35 @@
+import numpy as np, pandas as pd, pytest
+from correlation import CorrelationStats
+
+
+@pytest.fixture
+def data():
+    rng  = np.random.default_rng(0)
+    n    = 500
+    base = rng.normal(0, 1, (n, 1))
+    frame = pd.DataFrame(base + rng.normal(0, 1, (n, 4)), columns=['a', 'b', 'c', 'd'])
+    frame['year'] = rng.choice([2022, 2023, 2024], n)
+    frame['team'] = rng.choice(['NYY', 'LAD', 'BOS', 'SEA'], n)
+    frame['ip']   = rng.uniform(0, 200, n)
+    wars = frame[['a', 'b', 'c', 'd']]
+    return frame, wars, CorrelationStats(wars.to_numpy(), frame.year, frame.team, frame.ip)
+
+
+@pytest.mark.parametrize('years, teams, min_ip', [(None, None, 0), ([2022, 2024], None, 0),
+                                                  (None, ['LAD', 'SEA'], 50), ([2023], ['NYY'], 20)])
+def test_corr_matches_pandas(data, years, teams, min_ip):
+    frame, wars, stats = data
+    rows = frame.ip >= min_ip
+    if years is not None:
+        rows &= frame.year.isin(years)
+    if teams is not None:
+        rows &= frame.team.isin(teams)
+    np.testing.assert_allclose(stats.corr(years, teams, min_ip), wars[rows].corr().to_numpy(), atol=1e-10)
+
+
+def test_corr_of_fewer_than_two_rows_is_nan(data):
+    frame, wars, stats = data
+    assert np.isnan(stats.corr(years=[1999])).all()
+    one = CorrelationStats(wars.loc[[0]].to_numpy(), frame.year[:1], frame.team[:1], frame.ip[:1])
+    assert one.corr().shape == (4, 4)
+    assert np.isnan(one.corr()).all()
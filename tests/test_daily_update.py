@@ -0,0 +1,111 @@
+import os, json
+import numpy as np, pandas as pd, pytest
+import storage, daily_update
+from war_calc import war_columns
+
+
+pitchers = {1: ('Al Able', ['NYY']), 2: ('Bo Baker', ['NYY', 'LAD']), 3: ('Cy Cole', ['LAD'])}
+
+
+def games(rng, year, game_pks, names=pitchers):
+    '''Pitcher-game rows of the pitchers in ``names`` for the given games.'''
+    rows = []
+    for mlb_ID, (name, teams) in names.items():
+        for game_pk in game_pks:
+            rows.append({'mlb_ID': mlb_ID, 'year_ID': year, 'team_ID': teams[game_pk % len(teams)],
+                         'game_pk': game_pk, 'name_common': name, 'age': 30.0, 'PF_pit': 1.0})
+    day = pd.DataFrame(rows)
+    n   = len(day)
+    day['TBF'], day['outs'], day['G'] = rng.integers(20, 30, n), rng.integers(15, 21, n), 1
+    day['RA'] = day['xRA'] = rng.integers(0, 6, n).astype(float)
+    for col in ['RP_adj', 'ExIn_adj', 'R_def', 'PosR_def', 'FRV', 'Framing', 'ifFIPR', 'LI_adj']:
+        day[col] = rng.normal(0, 0.1, n)
+    for col in daily_update.count_columns:
+        day[col] = rng.integers(0, 5, n).astype(float)
+    return day
+
+
+@pytest.fixture
+def data(tmp_path):
+    '''A data directory holding 2023 and 2024 WARs, with 2024 seeded through game 9.'''
+    rng   = np.random.default_rng(0)
+    final = pd.DataFrame({'mlb_ID': [1, 2, 1, 2, 3], 'year_ID': [2023, 2023, 2024, 2024, 2024],
+                          'name_common': ['Al Able', 'Bo Baker', 'Al Able', 'Bo Baker', 'Cy Cole'],
+                          'age': 30.0, 'team_ID': ['NYY', 'NYY', 'NYY', '2TM', 'LAD'],
+                          **{c: rng.normal(1, 1, 5) for c in war_columns}})
+    storage.write_frame(final, os.path.join(tmp_path, 'final_wars'+storage.extension))
+    daily_update.seed(games(rng, 2024, range(10)), '2024-05-31', {2024: 0.15}, tmp_path)
+    return tmp_path, final, rng
+
+
+def read_final(directory):
+    return storage.read_frame(os.path.join(directory, 'final_wars'+storage.extension))
+
+
+def test_update_keeps_every_pitcher_season(data):
+    directory, final, rng = data
+    daily_update.update(games(rng, 2024, [10, 11]), '2024-06-01', directory=directory)
+    updated = read_final(directory)
+
+    pd.testing.assert_frame_equal(updated[updated.year_ID == 2023].reset_index(drop=True),
+                                  final[final.year_ID == 2023].reset_index(drop=True))
+    season = updated[updated.year_ID == 2024].set_index('mlb_ID')
+    assert sorted(season.index) == [1, 2, 3]
+    assert season.team_ID.to_dict() == {1: 'NYY', 2: '2TM', 3: 'LAD'}
+    assert np.isfinite(season[war_columns].to_numpy()).all()
+    with open(os.path.join(directory, 'last_updated.json')) as f:
+        assert json.load(f)['date'] == '2024-06-01'
+
+
+def test_update_skips_seeded_and_ingested_days(data):
+    directory, final, rng = data
+    assert daily_update.update(games(rng, 2024, [9]), '2024-05-31', directory=directory) is None
+    day = games(rng, 2024, [10])
+    assert daily_update.update(day, '2024-06-01', directory=directory) is not None
+    assert daily_update.update(day, '2024-06-01', directory=directory) is None
+
+
+def test_update_refuses_unseeded_data(tmp_path):
+    rng   = np.random.default_rng(0)
+    final = pd.DataFrame({'mlb_ID': [1], 'year_ID': [2024], 'name_common': ['Al Able'], 'age': 30.0,
+                          'team_ID': ['NYY'], **{c: [1.0] for c in war_columns}})
+    storage.write_frame(final, os.path.join(tmp_path, 'final_wars'+storage.extension))
+    with pytest.raises(FileNotFoundError):
+        daily_update.update(games(rng, 2024, [0]), '2024-06-01', directory=tmp_path)
+    pd.testing.assert_frame_equal(read_final(tmp_path), final)
+    assert not os.path.exists(os.path.join(tmp_path, 'last_updated.json'))
+
+
+def test_update_refuses_partial_season(data):
+    directory, final, rng = data
+    # seeded without Cy Cole, who is in final_wars for 2024
+    daily_update.seed(games(rng, 2024, range(10), {1: pitchers[1], 2: pitchers[2]}), '2024-05-31',
+                      {2024: 0.15}, directory)
+    with pytest.raises(ValueError, match='missing 1 pitcher-seasons'):
+        daily_update.update(games(rng, 2024, [10], {1: pitchers[1]}), '2024-06-01', directory=directory)
+    pd.testing.assert_frame_equal(read_final(directory), final)
+
+
+def test_rerun_after_a_crash_adds_the_day_once(data, monkeypatch):
+    directory, final, rng = data
+    before = daily_update.read_state(directory)[0].TBF.sum()
+    day    = games(rng, 2024, [10, 11])
+    write_frame = storage.write_frame
+    def crash(frame, path, *args, **kwargs):
+        if 'final_wars' in path:
+            raise KeyboardInterrupt
+        return write_frame(frame, path, *args, **kwargs)
+    monkeypatch.setattr(storage, 'write_frame', crash)
+    with pytest.raises(KeyboardInterrupt):
+        daily_update.update(day, '2024-06-01', directory=directory)
+    pd.testing.assert_frame_equal(read_final(directory), final)
+
+    monkeypatch.setattr(storage, 'write_frame', write_frame)
+    season_wars = daily_update.update(day, '2024-06-01', directory=directory)
+    aggregates, league, days = daily_update.read_state(directory)
+    assert aggregates.TBF.sum() == before + day.TBF.sum()
+    assert days['ingested'] == ['2024-06-01']
+    updated = read_final(directory)
+    pd.testing.assert_frame_equal(updated[updated.year_ID == 2024].reset_index(drop=True),
+                                  season_wars[updated.columns], check_dtype=False)
+    assert daily_update.update(day, '2024-06-01', directory=directory) is None
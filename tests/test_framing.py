@@ -0,0 +1,42 @@
+import numpy as np, pandas as pd, pytest
+from scipy.special import expit, logit
+from framing import random_columns, fit_framing, framing_runs
+
+
+sigmas = (0.2, 0.5, 0.3)
+
+
+@pytest.fixture(scope='module')
+def taken():
+    '''Taken pitches drawn from the model with known pitcher, catcher and batter sigmas.'''
+    rng, n = np.random.default_rng(0), 20000
+    taken = pd.DataFrame({'stand': rng.choice(['L', 'R'], n), 'p_throws': rng.choice(['L', 'R'], n),
+                          'balls': rng.integers(0, 4, n), 'strikes': rng.integers(0, 3, n),
+                          'cs_prob': rng.uniform(0.05, 0.95, n), 'game_year': 2024, 'pitch_team': 'NYY'})
+    eta = logit(taken.cs_prob.to_numpy())
+    for col, n_players, sigma in zip(random_columns, (40, 40, 60), sigmas):
+        taken[col] = rng.integers(0, n_players, n)
+        eta = eta + rng.normal(0, sigma, n_players)[taken[col]]
+    taken['called_strike'] = (rng.uniform(size=n) < expit(eta)).astype(int)
+    return taken
+
+
+@pytest.fixture(scope='module')
+def fit(taken):
+    return fit_framing(taken)
+
+
+def test_fit_recovers_the_sigmas(fit):
+    np.testing.assert_allclose(fit.sigmas[random_columns], sigmas, rtol=0.3)
+
+
+def test_warm_start_takes_fewer_steps(taken, fit):
+    warm = fit_framing(taken, start=fit)
+    assert warm.newton_steps < fit.newton_steps/2
+    np.testing.assert_allclose(warm.sigmas, fit.sigmas, rtol=0.1)
+
+
+def test_framing_runs_are_the_called_strikes_added(taken, fit):
+    runs = framing_runs(taken, fit)
+    assert len(runs) == taken.pitcher.nunique()
+    np.testing.assert_allclose(runs.framing_runs, 0.125*runs.called_strike_diff)
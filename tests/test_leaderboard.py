@@ -0,0 +1,60 @@
+import numpy as np, pandas as pd, pytest
+import storage
+from storage import data_path
+from leaderboard import Leaderboard, NameIndex, normalize
+
+
+@pytest.fixture(scope='module')
+def names():
+    return storage.read_frame(data_path('final_wars'), ['name_common']).name_common.astype('category')
+
+
+def brute_force(names, query):
+    query = normalize(query.strip())
+    folded = names.astype(str).map(normalize)
+    if len(query) < 3:
+        return folded.map(lambda name: any(word.startswith(query) for word in name.split())).to_numpy()
+    return folded.map(lambda name: query in name).to_numpy()
+
+
+def test_normalize_folds_accents_and_case():
+    assert normalize('Álvarez') == normalize('ALVAREZ') == 'alvarez'
+    assert normalize('Martínez') == 'martinez'
+
+
+def test_search_matches_a_scan(names):
+    index = NameIndex(names)
+    rng   = np.random.default_rng(0)
+    queries = ['Sánchez', 'sanchez', 'RODRIGUEZ', 'zack w', 'wh', 'a', 'xyz', 'ez', ' ']
+    for name in rng.choice(names.cat.categories, 50):
+        start = rng.integers(0, len(name) - 1)
+        queries.append(name[start:start + rng.integers(1, 7)])
+    for query in queries:
+        np.testing.assert_array_equal(index.mask(query), brute_force(names, query), err_msg=repr(query))
+
+
+def test_missing_names_never_match():
+    index = NameIndex(pd.Series(['Aníbal Sánchez', None, 'Aaron Sanchez']))
+    assert index.mask('sanchez').tolist() == [True, False, True]
+    assert index.mask('').tolist() == [True, False, True]
+
+
+def test_missing_years_and_teams_match_no_level():
+    frame = pd.DataFrame({'Name': ['Al Able', 'Bo Baker', 'Cy Cole', 'Di Dean'],
+                          'Year': [2023, 2024, np.nan, 2024], 'Team': ['NYY', 'LAD', 'LAD', None],
+                          'xBaseRuns': [1., 2., 3., 4.]})
+    board = Leaderboard(frame, ['xBaseRuns'])
+    # the missing values must not land in the last level, 2024 and LAD
+    assert board.filter_mask([2024], ['NYY', 'LAD']).tolist() == [False, True, False, True]
+    assert board.filter_mask([2023, 2024], ['LAD']).tolist() == [False, True, True, False]
+    assert board.filter_mask([2024], ['LAD']).tolist() == [False, True, False, False]
+
+
+def test_range_mask_leaves_out_missing_values():
+    frame = pd.DataFrame({'Name': ['Al Able', 'Bo Baker', 'Cy Cole'], 'Year': 2024, 'Team': 'NYY',
+                          'Age': [24, 31, np.nan], 'xBaseRuns': [1., np.nan, 3.]})
+    board = Leaderboard(frame, ['xBaseRuns'])
+    assert board.range_mask('Age', 25, 40).tolist() == [False, True, False]
+    assert board.range_mask('xBaseRuns', 2).tolist() == [False, False, True]
+    assert board.range_mask('xBaseRuns').tolist() == [True, True, True]
+    assert board.range_mask('Custom', high=0, values=[-1., 0., 1.]).tolist() == [True, True, False]
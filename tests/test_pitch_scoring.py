@@ -0,0 +1,68 @@
+import os, pickle
+import numpy as np, pandas as pd, pyarrow as pa, pyarrow.parquet as pq, pytest
+import pitch_scoring
+from pitch_scoring import outcomes, submodels
+
+
+class StubModel:
+    '''Puts all of a pitch's probability on one outcome, picked by the sub-model.'''
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def predict_proba(self, features):
+        probs = np.zeros((len(features), len(outcomes)))
+        probs[:,self.outcome] = 1
+        return probs
+
+
+def test_classify_slow_cutters_bend():
+    chunk = pd.DataFrame({'pitch_type': ['FC', 'FC', 'FF', 'CH', 'SL', 'XX'],
+                          'release_speed': [84.0, 90.0, 80.0, 85.0, 85.0, 85.0]})
+    assert pitch_scoring.classify(chunk).tolist() == ['bend', 'fast', 'fast', 'slow', 'bend', 'bend']
+
+
+def test_route():
+    chunk = pd.DataFrame({'pitcher': [1, 1, 1, 2, 3], 'game_year': 2024,
+                          'pitch_type': ['SL', 'FF', 'CH', 'FF', 'CU'], 'release_speed': 85.0})
+    primary = pd.Series(['bend', 'fast'], index=pd.MultiIndex.from_tuples([(1, 2024), (2, 2024)]))
+    # a primary breaking ball goes to the primary slow model, a pitcher without
+    # a primary pitch gets the secondary models
+    assert pitch_scoring.route(chunk, primary).tolist() == ['primary_slow', 'secondary_fast', 'secondary_slow',
+                                                            'primary_fast', 'secondary_bend']
+
+
+@pytest.fixture
+def pitches(tmp_path):
+    rng = np.random.default_rng(0)
+    n   = 1000
+    frame = pd.DataFrame({'pitcher': rng.choice([1, 2, 3], n), 'game_year': rng.choice([2023, 2024], n),
+                          'pitch_type': rng.choice(['FF', 'FC', 'CH', 'SL', 'CU'], n),
+                          'release_speed': rng.uniform(75, 100, n), 'spin': rng.normal(2300, 200, n)})
+    frame['pitch_team'] = np.where(frame.pitcher == 1, 'NYY', 'LAD')
+    models_path = os.path.join(tmp_path, 'models.pickle')
+    with open(models_path, 'wb') as f:
+        pickle.dump({name: StubModel(i) for i, name in enumerate(submodels)}, f)
+    return frame, models_path
+
+
+@pytest.mark.parametrize('fmt', ['arrow', 'parquet'])
+def test_score_counts_every_pitch_once(tmp_path, pitches, fmt):
+    frame, models_path = pitches
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    path  = os.path.join(tmp_path, 'pitches.'+fmt)
+    if fmt == 'parquet':
+        pq.write_table(table, path, row_group_size=300)
+    else:
+        with pa.ipc.new_file(path, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=300):
+                writer.write_batch(batch)
+
+    scored = pitch_scoring.score(path, models_path, ['spin'], chunk_size=128, workers=2, max_pending=2)
+    assert scored.piPitches.sum() == len(frame)
+    assert len(scored) == len(frame.groupby(pitch_scoring.season_keys))
+    sizes = frame.groupby(pitch_scoring.season_keys).size()
+    np.testing.assert_array_equal(scored.set_index(pitch_scoring.season_keys).piPitches.loc[sizes.index], sizes)
+    # each pitch's probability lands on its sub-model's outcome
+    routed = pitch_scoring.route(frame, pitch_scoring.primary_pitches(path, 128))
+    for i, name in enumerate(submodels):
+        assert scored['pi'+outcomes[i]].sum() == (routed == name).sum()
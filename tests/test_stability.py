@@ -0,0 +1,40 @@
+import numpy as np, pandas as pd, pytest
+import stability
+
+
+@pytest.fixture
+def seasons():
+    '''Three seasons per pitcher where the estimator flips sign every season and
+    RA9 is a linear function of it.'''
+    a = np.array([1., 2., 4., 7., 3.])
+    frame = pd.DataFrame({'pitcher': np.tile(np.arange(5), 3), 'year': np.repeat([2020, 2021, 2022], 5),
+                          'est': np.concatenate([a, -a, a]), 'ip': 50.0})
+    frame['ra9'] = 2*frame.est + 1
+    return frame
+
+
+def test_known_lag_correlations(seasons):
+    descr, relia = stability.lagged_correlations(seasons, ['est'])
+    assert descr.year.tolist() == [0, 1, 2, 3]
+    np.testing.assert_allclose(descr.est[:3], [1, -1, 1])
+    np.testing.assert_allclose(relia.est[:3], [1, -1, 1])
+    # no pitcher is four seasons apart
+    assert np.isnan(descr.est[3]) and np.isnan(relia.est[3])
+
+
+def test_results_are_cached_per_input(seasons, monkeypatch):
+    stability._cache.clear()
+    calls = []
+    pairs = stability._season_pairs
+    monkeypatch.setattr(stability, '_season_pairs', lambda *args: calls.append(1) or pairs(*args))
+
+    descr, _ = stability.lagged_correlations(seasons, ['est'])
+    descr['est'] = 0
+    again, _ = stability.lagged_correlations(seasons.iloc[::-1], ['est'])
+    assert len(calls) == 1
+    np.testing.assert_allclose(again.est[:3], [1, -1, 1])
+
+    stability.lagged_correlations(seasons, ['est'], max_lag=2)
+    changed = seasons.assign(ra9=seasons.ra9.where(seasons.year != 2021, 0))
+    stability.lagged_correlations(changed, ['est'])
+    assert len(calls) == 3
@@ -0,0 +1,54 @@
+import os
+import pandas as pd, pyarrow as pa, pyarrow.feather as feather, pytest
+import storage
+
+
+@pytest.fixture
+def path(tmp_path):
+    frame = pd.DataFrame({'mlb_ID': [1, 2], 'Name': ['Al Able', 'Bo Baker'], 'war': [1.5, -0.5]})
+    return storage.write_frame(frame, os.path.join(tmp_path, 'wars'+storage.extension))
+
+
+def test_round_trip(path):
+    frame = storage.read_frame(path, ['war', 'mlb_ID'])
+    assert frame.columns.tolist() == ['war', 'mlb_ID']
+    assert frame.war.tolist() == [1.5, -0.5]
+    assert storage.read_schema(path) == {'mlb_ID': 'int64', 'Name': 'large_string', 'war': 'double'}
+
+
+def test_missing_columns_are_refused(path):
+    with pytest.raises(ValueError, match=r"no columns \['age'\]"):
+        storage.read_frame(path, ['mlb_ID', 'age'])
+
+
+def test_files_that_differ_from_their_stamp_are_refused(path):
+    # rewritten outside ``write_frame``, with the old stamp kept
+    table = feather.read_table(path)
+    table = table.set_column(2, 'war', table.column('war').cast(pa.string()))
+    feather.write_feather(table, path)
+    with pytest.raises(ValueError, match='stamped schema'):
+        storage.read_frame(path)
+    assert storage.read_frame(path, ['mlb_ID']).mlb_ID.tolist() == [1, 2]
+
+
+def test_unstamped_files_are_refused(tmp_path):
+    path = os.path.join(tmp_path, 'plain'+storage.extension)
+    feather.write_feather(pa.table({'a': [1]}), path)
+    with pytest.raises(ValueError, match='no format version'):
+        storage.read_frame(path)
+
+
+def test_convert_keeps_newer_arrow_files(tmp_path):
+    pickle_path = os.path.join(tmp_path, 'wars.pickle')
+    pd.DataFrame({'war': [1.0]}).to_pickle(pickle_path)
+    path = storage.convert(pickle_path)
+    assert storage.read_source(path) == 'wars.pickle'
+    # reconverting an untouched conversion is fine
+    storage.convert(pickle_path)
+
+    storage.write_frame(pd.DataFrame({'war': [2.0]}), path, source='daily_update.py 2025-06-01')
+    with pytest.raises(FileExistsError, match='daily_update.py'):
+        storage.convert(pickle_path)
+    assert storage.read_frame(path).war.tolist() == [2.0]
+    storage.convert(pickle_path, force=True)
+    assert storage.read_frame(path).war.tolist() == [1.0]
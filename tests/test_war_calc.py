@@ -0,0 +1,77 @@
+import numpy as np, pandas as pd, pytest
+import war_calc
+from war_calc import WarPipeline, compute_wars, input_columns, league_columns, war_columns
+
+
+def inputs_for(rng, years):
+    '''Ten random pitcher-seasons per year.'''
+    n = 10*len(years)
+    inputs = pd.DataFrame({'year': np.repeat(years, 10)})
+    for col in input_columns[1:]:
+        inputs[col] = rng.normal(0, 2, n)
+    inputs['PF_pit'] = rng.uniform(0.9, 1.1, n)
+    inputs['TBF']    = rng.integers(50, 800, n).astype(float)
+    inputs['outs']   = inputs.TBF*0.7
+    inputs['G']      = rng.integers(5, 35, n).astype(float)
+    inputs['xRA']    = inputs['RA'] = inputs.outs/27*4.5 + rng.normal(0, 3, n)
+    return inputs
+
+
+@pytest.fixture
+def data():
+    rng    = np.random.default_rng(0)
+    league = pd.DataFrame([[700., 162., 0.15], [650., 160., 0.16]], index=[2023, 2024], columns=league_columns)
+    return inputs_for(rng, [2023, 2024]), league
+
+
+def test_league_adjust_zeroes_every_season(data):
+    inputs, _ = data
+    codes, seasons = pd.factorize(inputs.year)
+    x   = {c: inputs[c].to_numpy(dtype=float) for c in input_columns[1:]}
+    x['RA_per_TBF_lg'] = np.full(len(inputs), 0.12)
+    raa = war_calc._league_adjust(war_calc.raa_before_adjustment(x), codes, len(seasons), x['outs'])
+    assert raa.shape == (len(war_columns), len(inputs))
+    for code in range(len(seasons)):
+        np.testing.assert_allclose(raa[:,codes == code].sum(axis=1), 0, atol=1e-9)
+
+
+def test_league_adjust_spreads_by_share():
+    values = np.array([[3., 1., 2., 5.]])
+    codes  = np.array([0, 0, 1, 1])
+    share  = np.array([1., 3., 0., 0.])
+    adjusted = war_calc._league_adjust(values, codes, 2, share)
+    # season 0 gives back its total of 4 a quarter and three quarters at a time,
+    # season 1 has no share to spread over and is left alone
+    np.testing.assert_allclose(adjusted, [[2., -2., 2., 5.]])
+
+
+def test_pythagenpat_waa_by_hand():
+    # x = 8.5**0.285 = 1.84033, wpct = 1/(1 + (4/4.5)**x) = 0.553977
+    assert war_calc.pythagenpat_waa(10, 4.5, 4.0) == pytest.approx(0.539773, abs=1e-6)
+    assert war_calc.pythagenpat_waa(10, 4.5, 4.5) == 0
+    # negative runs allowed count as a shutout
+    assert war_calc.pythagenpat_waa(10, 4.5, -1.0) == 5
+
+
+def test_pipeline_only_recomputes_changed_seasons(data, monkeypatch):
+    inputs, league = data
+    pipeline = WarPipeline()
+    assert pipeline.recomputed(inputs, league) == [2023, 2024]
+    first = pipeline.run(inputs, league)
+    pd.testing.assert_frame_equal(first, compute_wars(inputs, league))
+
+    changed = inputs.copy()
+    changed.loc[changed.year == 2024, 'FRV'] += 1
+    assert pipeline.recomputed(inputs, league) == []
+    assert pipeline.recomputed(changed, league) == [2024]
+
+    calls = []
+    monkeypatch.setattr(war_calc, 'compute_wars',
+                        lambda season, lg: calls.append(sorted(season.year.unique())) or compute_wars(season, lg))
+    second = pipeline.run(changed, league)
+    assert calls == [[2024]]
+    pd.testing.assert_frame_equal(second[changed.year == 2023], first[inputs.year == 2023])
+    pd.testing.assert_frame_equal(second, compute_wars(changed, league))
+
+    league.loc[2023, 'rep_rpo'] = 0.17
+    assert pipeline.recomputed(changed, league) == [2023]
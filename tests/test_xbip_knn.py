@@ -0,0 +1,50 @@
+import numpy as np, pandas as pd, pytest
+from xbip_knn import BattedBallKNN, outcomes
+
+
+@pytest.fixture(scope='module')
+def train():
+    '''Batted balls whose outcome depends smoothly on EV and LA.'''
+    rng = np.random.default_rng(0)
+    n   = 5000
+    ev  = rng.uniform(40, 120, n)
+    la  = rng.uniform(-60, 70, n)
+    hit = rng.uniform(size=n) < (ev - 40)/80*np.exp(-((la - 15)/30)**2)
+    outcome = np.where(hit, np.where(la > 25, 'HR', 'S'), np.where(la < 0, 'GIDP', 'BIPOut'))
+    return ev, la, outcome
+
+
+@pytest.fixture(scope='module')
+def models(train):
+    return BattedBallKNN(*train, k=30), BattedBallKNN(*train, k=30, grid=None)
+
+
+def test_grid_is_the_exact_query_at_the_cell_centre(models):
+    gridded, exact = models
+    rng = np.random.default_rng(1)
+    ev, la = rng.uniform(50, 110, 200), rng.uniform(-40, 60, 200)
+    probs = gridded.predict_proba(ev, la)
+    # (0.5, 0.5) cells, so each query is moved by at most a quarter mph and degree in each direction
+    centre = lambda x: np.floor(x/0.5)*0.5 + 0.25
+    np.testing.assert_array_equal(probs, exact.predict_proba(centre(ev), centre(la)))
+    assert np.abs(probs - exact.predict_proba(ev, la)).mean() < 0.01
+    np.testing.assert_allclose(probs.sum(axis=1), 1)
+
+
+def test_out_of_range_is_clipped_and_missing_is_nan(models):
+    gridded, exact = models
+    probs = gridded.predict_proba([200., -10., 80., np.nan, 80.], [10., -120., 95., 10., np.nan])
+    np.testing.assert_array_equal(probs[:3], exact.predict_proba([124.75, 0.25, 80.25], [10.25, -89.75, 89.75]))
+    assert np.isnan(probs[3:]).all()
+    assert np.isnan(exact.predict_proba([np.nan], [10.]))[0].all()
+
+
+def test_expected_counts_sum_to_the_batted_balls(models):
+    gridded, _ = models
+    rng = np.random.default_rng(2)
+    bip = pd.DataFrame({'pitcher': rng.choice([1, 2, 3], 300), 'game_year': rng.choice([2023, 2024], 300),
+                        'launch_speed': rng.uniform(50, 110, 300), 'launch_angle': rng.uniform(-40, 60, 300)})
+    counts = gridded.expected_counts(bip, ['pitcher', 'game_year'])
+    assert counts.columns.tolist() == ['x'+o for o in outcomes]
+    sizes = bip.groupby(['pitcher', 'game_year']).size()
+    np.testing.assert_allclose(counts.sum(axis=1), sizes.loc[counts.index])
@@ -0,0 +1,117 @@
+'''The rWAR-style RAA -> WAA -> WAR pipeline behind all eight WARs.
+
+Takes one row per pitcher-season with the inputs named as in the "Details of the
+WAR calculation" and "RAA Calculations" expanders:
+
+    year, xRA, PF_pit, RP_adj, ExIn_adj, RA, R_def, PosR_def, FRV, Framing,
+    BsR, xBsR, ifFIPR, piBsR, stBsR, TBF, outs, G, LI_adj
+
+where R_def and PosR_def are already prorated by the pitcher's share of his
+team's balls in play, and a league frame indexed by year with
+
+    R_lg, G_lg, rep_rpo
+
+the league's runs and team games, and the replacement level runs per out.
+
+Every WAR of every pitcher-season is computed at once as an (8, n) array, and
+the league adjustments are per-season sums done with ``np.bincount``.
+'''
+import numpy as np, pandas as pd
+
+
+war_columns    = ['ra_war', 'r_war', 'oaa_war', 'bsr_war', 'xbsr_war', 'fip_war', 'pitch_war', 'stuff_war']
+input_columns  = ['year', 'xRA', 'PF_pit', 'RP_adj', 'ExIn_adj', 'RA', 'R_def', 'PosR_def',
+                  'FRV', 'Framing', 'BsR', 'xBsR', 'ifFIPR', 'piBsR', 'stBsR',
+                  'TBF', 'outs', 'G', 'LI_adj']
+league_columns = ['R_lg', 'G_lg', 'rep_rpo']
+
+pythagenpat_exponent = 0.285
+
+
+def raa_before_adjustment(x):
+    '''RAA of every variant before the league adjustment, shape (8, n).
+
+    ``x`` maps input names to arrays, plus ``RA_per_TBF_lg`` for the pitch models.
+    '''
+    pf_xra   = x['PF_pit']*(x['xRA'] + x['RP_adj'])
+    pf_pos   = x['PF_pit']*(x['xRA'] - x['PosR_def'] + x['RP_adj'])
+    lg_tbf   = x['RA_per_TBF_lg']*x['TBF'] + x['RP_adj']
+    return np.stack([
+        x['xRA'] + x['RP_adj'] + x['ExIn_adj'] - x['RA'],
+        x['PF_pit']*(x['xRA'] - x['R_def'] + x['RP_adj']) + x['ExIn_adj'] - x['RA'],
+        pf_pos - x['FRV'] - x['Framing'] + x['ExIn_adj'] - x['RA'],
+        pf_pos - x['FRV'] - x['Framing'] - x['BsR'],
+        pf_xra - x['Framing'] - x['xBsR'],
+        pf_xra - x['Framing'] - x['ifFIPR'],
+        lg_tbf - x['piBsR'],
+        lg_tbf - x['stBsR']])
+
+
+def _league_adjust(values, codes, n_seasons, share):
+    # shift each season so its total is 0, spread in proportion to ``share``
+    totals = np.stack([np.bincount(codes, v, n_seasons) for v in values])
+    shares = np.bincount(codes, share, n_seasons)
+    per    = np.divide(totals, shares, out=np.zeros_like(totals), where=shares != 0)
+    return values - per[:,codes]*share
+
+
+def pythagenpat_waa(G, rs_per_g, ra_per_g):
+    '''Wins above a .500 team over G games allowing ``ra_per_g`` with ``rs_per_g`` of support.'''
+    ra_per_g = np.maximum(ra_per_g, 0)
+    x    = (rs_per_g + ra_per_g)**pythagenpat_exponent
+    wpct = 1/(1 + (ra_per_g/rs_per_g)**x)
+    return G*(wpct - 0.5)
+
+
+def compute_wars(inputs, league):
+    '''All eight WARs for every row of ``inputs``, as a frame in the order of
+    ``war_columns`` sharing the index of ``inputs``.'''
+    codes, seasons = pd.factorize(inputs['year'])
+    n_seasons = len(seasons)
+    lg = league.loc[seasons]
+    x  = {c: inputs[c].to_numpy(dtype=float) for c in input_columns[1:]}
+
+    ra_sum  = np.bincount(codes, x['RA'], n_seasons)
+    x['RA_per_TBF_lg'] = (ra_sum/np.bincount(codes, x['TBF'], n_seasons))[codes]
+    lg_rpo  = (ra_sum/np.bincount(codes, x['outs'], n_seasons))[codes]
+    r_per_g = (lg['R_lg']/lg['G_lg']).to_numpy(dtype=float)[codes]
+    rep_rpo = lg['rep_rpo'].to_numpy(dtype=float)[codes]
+
+    raa = _league_adjust(raa_before_adjustment(x), codes, n_seasons, x['outs'])
+
+    G = x['G']
+    per_g = lambda runs: np.divide(runs, G, out=np.zeros_like(runs), where=G > 0)
+    waa = pythagenpat_waa(G, r_per_g, r_per_g - per_g(raa))
+    waa = _league_adjust(waa, codes, n_seasons, x['outs'])
+    waa_rep = pythagenpat_waa(G, r_per_g, r_per_g + per_g((rep_rpo - lg_rpo)*x['outs']))
+
+    war = waa - waa_rep + x['LI_adj']
+    return pd.DataFrame(war.T, index=inputs.index, columns=war_columns)
+
+
+def _season_digest(season_inputs, season_league):
+    return (pd.util.hash_pandas_object(season_inputs[input_columns]).sum(),
+            tuple(season_league[league_columns]))
+
+
+class WarPipeline:
+    '''Keeps each season's WARs and only recomputes the seasons whose inputs or
+    league values changed since the last ``run``. The league adjustments only
+    couple rows within a season, so seasons are independent.'''
+    def __init__(self):
+        self._seasons = {}
+
+    def run(self, inputs, league):
+        results = []
+        for year, season in inputs.groupby('year', sort=False):
+            digest = _season_digest(season, league.loc[year])
+            cached = self._seasons.get(year)
+            if cached is None or cached[0] != digest:
+                cached = self._seasons[year] = (digest, compute_wars(season, league))
+            results.append(cached[1])
+        return pd.concat(results).loc[inputs.index]
+
+    def recomputed(self, inputs, league):
+        '''Seasons whose WARs the next ``run`` would recompute.'''
+        return [year for year, season in inputs.groupby('year', sort=False)
+                if self._seasons.get(year, (None,))[0] != _season_digest(season, league.loc[year])]
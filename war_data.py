@@ -0,0 +1,248 @@
+'''Loaders for the data files behind the app.
+
+Data files are read from their Arrow form (see ``storage.py``) when one has been
+converted, and from the original pickle otherwise.
+
+Every loader is cached once per process and shared between sessions. The cache
+is keyed on a digest of the underlying file, so replacing a data file is picked
+up on the next rerun without restarting the server. The returned frames are
+shared, so callers must not modify them in place. They are stored compactly,
+with categorical names and teams, int16 years and ages and float32 values, so
+that the one copy per process stays small.
+'''
+import os, json, hashlib, functools, datetime
+import numpy as np, pandas as pd, streamlit as st, plotly.io as pio
+import storage
+from storage import data_dir, data_path
+from war_calc import war_columns
+from leaderboard import Leaderboard
+from correlation import CorrelationStats
+from careers import Careers
+import plots
+
+
+figure_dir = os.path.join(data_dir, 'figures')
+
+war_names   = ['Runs Allowed','Baseball Reference',
+               'OAA','BaseRuns','xBaseRuns','FIP',
+               'Pitching+','Stuff+']
+
+wars_renames = {'name_common': 'Name', 'age': 'Age', 'year_ID':'Year', 'team_ID': 'Team',
+                **{v: war_names[i] for i,v in enumerate(war_columns)}}
+
+estimator_names = {'ra9': 'RA9', 'bsra9': 'BaseRuns9',
+                   'xbsra9': 'xBaseRuns9', 'K%':'K%', 'pibsra9': 'Pitching+ BsR9',
+                   'xERA': 'xERA', 'stbsra9': 'Stuff+ BsR9', 'pirv9': 'Pitching+ RV9',
+                   'strv9': 'Stuff+ RV9'}
+
+display_columns = ['name_common', 'year_ID', 'age', 'team_ID'] + war_columns
+
+# how far below and above each WAR its bootstrap interval reaches (see ``bootstrap.py``)
+interval_suffixes = (' -', ' +')
+
+
+@functools.lru_cache(maxsize=64)
+def _hash_file(path, mtime_ns, size):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    '''Content hash of ``path``, only re-read from disk when its mtime or size changes.'''
+    stat = os.stat(path)
+    return _hash_file(path, stat.st_mtime_ns, stat.st_size)
+
+
+def compact(frame):
+    '''``frame`` with categorical strings, int16 whole numbers and float32 values.'''
+    types = {}
+    for col, dtype in frame.dtypes.items():
+        if col in ('Name', 'Team', 'name_common', 'team_ID'):
+            types[col] = 'category'
+        elif col in ('Year', 'Age', 'year_ID', 'age') and pd.api.types.is_numeric_dtype(dtype) \
+                and frame[col].notna().all():
+            types[col] = np.int16
+        elif pd.api.types.is_float_dtype(dtype):
+            types[col] = np.float32
+    return frame.astype(types)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_wars(path, digest):
+    wars = storage.read_frame(path)
+    wars.rename(columns=wars_renames, inplace=True)
+    return compact(wars)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_disp_wars(path, digest, intervals_path, intervals_digest):
+    disp_wars = storage.read_frame(path, display_columns + ['mlb_ID'])
+    disp_wars.rename(columns=wars_renames, inplace=True)
+    disp_wars.sort_values('xBaseRuns',ascending=False,ignore_index=True,inplace=True)
+    disp_wars['Average'] = disp_wars.loc[:,war_names].mean(axis=1)
+    disp_wars['StdDev']  = disp_wars.loc[:,war_names].std(axis=1)
+    if intervals_path is not None:
+        intervals = storage.read_frame(intervals_path).rename(columns={'year_ID': 'Year'})
+        intervals.rename(columns={f'{c}_{side}': war_names[i] + suffix for i, c in enumerate(war_columns)
+                                  for side, suffix in zip(('minus', 'plus'), interval_suffixes)}, inplace=True)
+        disp_wars = disp_wars.merge(intervals, on=['mlb_ID', 'Year'], how='left')
+    return compact(disp_wars.drop(columns='mlb_ID'))
+
+
+def _intervals(name):
+    path = data_path(name)
+    return (path, file_digest(path)) if os.path.exists(path) else (None, None)
+
+
+def load_wars(name='final_wars'):
+    '''Every pitcher-season with its eight WARs, under their display names.'''
+    path = data_path(name)
+    return _load_wars(path, file_digest(path))
+
+
+def load_disp_wars(name='final_wars', intervals_name='war_intervals'):
+    '''The leaderboard frame: display columns sorted by xBaseRuns WAR with the
+    Average and StdDev across the eight WARs, and the WARs' intervals when they
+    have been computed.'''
+    path = data_path(name)
+    return _load_disp_wars(path, file_digest(path), *_intervals(intervals_name))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_leaderboard(*paths_and_digests):
+    return Leaderboard(_load_disp_wars(*paths_and_digests), war_names)
+
+
+def load_leaderboard(name='final_wars', intervals_name='war_intervals'):
+    '''The leaderboard frame wrapped for serving sorted, filtered windows of it.'''
+    path = data_path(name)
+    return _load_leaderboard(path, file_digest(path), *_intervals(intervals_name))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_careers(path, digest):
+    return Careers(_load_wars(path, digest), war_names)
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _load_span_leaderboard(path, digest, first, last):
+    careers = _load_careers(path, digest)
+    return Leaderboard(compact(careers.span(first, last)), war_names, careers.teams(first, last))
+
+
+def load_span_leaderboard(first, last, name='final_wars'):
+    '''The leaderboard of every pitcher's WARs summed over seasons ``first`` to
+    ``last``, built once per range. Its team filter keeps a pitcher who played
+    for any of the teams in the range.'''
+    path = data_path(name)
+    return _load_span_leaderboard(path, file_digest(path), first, last)
+
+
+def interval_columns(frame):
+    '''The interval columns of ``frame``.'''
+    return [c for c in frame.columns if c.endswith(interval_suffixes)]
+
+
+def interval_errors(frame):
+    '''How far below and above each of the eight WARs of every row its interval
+    reaches, as two (n, 8) arrays that are NaN where a WAR has no interval.'''
+    return tuple(frame.reindex(columns=[n+suffix for n in war_names]).to_numpy(dtype=float)
+                 for suffix in interval_suffixes)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_correlation_wars(path, digest):
+    pitcher_years = storage.read_frame(path)
+    pitcher_years.rename(columns={v: war_names[i] for i,v in enumerate(war_columns)}, inplace=True)
+    return compact(pitcher_years)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_correlation_stats(path, digest, wars_path, wars_digest, pitch_path, pitch_digest):
+    pitcher_years = _load_correlation_wars(path, digest)
+    teams = storage.read_frame(wars_path, ['mlb_ID', 'year_ID', 'team_ID'])
+    outs  = storage.read_frame(pitch_path, ['pitcher', 'game_year', 'is_out']) \
+                   .groupby(['pitcher', 'game_year']).is_out.sum()
+    keys  = pd.MultiIndex.from_frame(pitcher_years[['mlb_ID', 'year_ID']])
+    team  = teams.set_index(['mlb_ID', 'year_ID']).team_ID.reindex(keys)
+    ip    = outs.reindex(keys).to_numpy(dtype=float)/3
+    return CorrelationStats(pitcher_years[war_names], pitcher_years.year_ID, team, ip)
+
+
+def load_correlation_wars(name='wars_for_correlation'):
+    path = data_path(name)
+    return _load_correlation_wars(path, file_digest(path))
+
+
+def load_correlation_stats(name='wars_for_correlation', wars_name='final_wars', pitch_name='pitch'):
+    '''Per (year, team, innings) sufficient statistics of the eight WARs, for
+    correlation matrices that follow the leaderboard filters.'''
+    paths = [data_path(n) for n in (name, wars_name, pitch_name)]
+    return _load_correlation_stats(*[v for p in paths for v in (p, file_digest(p))])
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _load_descriptiveness(path, digest):
+    descr_df = storage.read_frame(path)
+    descr_df.rename(columns=estimator_names,inplace=True)
+    descr_df['Years into the Future'] = np.arange(descr_df.shape[0])
+    return descr_df
+
+
+def load_xera_descriptiveness(name='xera_descriptiveness_df'):
+    '''Correlation of each run estimator (and xERA) to RA9 0-3 years into the future.'''
+    path = data_path(name)
+    return _load_descriptiveness(path, file_digest(path))
+
+
+def load_rv_vs_bsr_descriptiveness(name='rv_vs_bsr_descr_df'):
+    '''Correlation of the pitch-model run values and BaseRuns to RA9 0-3 years into the future.'''
+    path = data_path(name)
+    return _load_descriptiveness(path, file_digest(path))
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _load_figure(path, digest):
+    with open(path) as f:
+        return pio.from_json(f.read())
+
+
+def load_figure(name):
+    '''The static chart ``name`` loaded from its prebuilt spec (see ``build_figures.py``),
+    which is built on the spot if it hasn't been written yet.'''
+    path = os.path.join(figure_dir, name+'.json')
+    if not os.path.exists(path):
+        from build_figures import write_figure
+        write_figure(name)
+    return _load_figure(path, file_digest(path))
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _load_correlation_figure(years, teams, min_ip, *paths_and_digests):
+    stats = _load_correlation_stats(*paths_and_digests)
+    corr  = pd.DataFrame(stats.corr(years, teams, min_ip), index=war_names, columns=war_names)
+    return plots.correlation_figure(corr)
+
+
+def load_correlation_figure(years, teams, min_ip=0, name='wars_for_correlation',
+                            wars_name='final_wars', pitch_name='pitch'):
+    '''Heatmap of the WAR correlations under the given filters, built once per
+    filter combination.'''
+    paths = [data_path(n) for n in (name, wars_name, pitch_name)]
+    return _load_correlation_figure(tuple(sorted(years)), tuple(sorted(teams)), min_ip,
+                                    *[v for p in paths for v in (p, file_digest(p))])
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_last_updated(path, digest):
+    with open(path) as f:
+        return datetime.date.fromisoformat(json.load(f)['date'])
+
+
+def load_last_updated(name='last_updated.json'):
+    '''Date of the last data update, from the stamp written by ``daily_update.py``.'''
+    path = os.path.join(data_dir, name)
+    return _load_last_updated(path, file_digest(path))
@@ -0,0 +1,79 @@
+'''Expected ball-in-play outcomes from exit velocity and launch angle.
+
+The xBaseRuns classifier: each batted ball's outcome probabilities are the
+outcome frequencies of its k nearest training batted balls in (EV, LA), as for
+xwOBA. The training window is indexed once in a KD-tree. By default the
+neighbourhoods are also precomputed over a fine EV x LA grid, so that scoring
+any number of batted balls is an array lookup:
+
+    model  = BattedBallKNN(train.launch_speed, train.launch_angle, train.outcome)
+    counts = model.expected_counts(bip, ['pitcher', 'game_year'])
+
+gives the ``xS``, ``xD``, ``xT``, ``xHR``, ``xSF``, ``xGIDP`` and ``xBIPOut``
+columns per pitcher-season.
+'''
+import numpy as np, pandas as pd
+from scipy.spatial import cKDTree
+
+
+outcomes = ['S', 'D', 'T', 'HR', 'SF', 'GIDP', 'BIPOut']
+
+# one degree of launch angle counts as much as this many mph of exit velocity
+la_per_mph = 1.0
+ev_range   = (0.0, 125.0)
+la_range   = (-90.0, 90.0)
+
+
+class BattedBallKNN:
+    '''k-nearest-neighbour outcome probabilities over (EV, LA).
+
+    ``outcome`` holds the names in ``outcomes``. With ``grid=(ev_step, la_step)``
+    queries are snapped to the centre of their grid cell. With ``grid=None`` every
+    query searches the tree directly.
+    '''
+    def __init__(self, ev, la, outcome, k=100, grid=(0.5, 0.5)):
+        codes = pd.Categorical(np.asarray(outcome), categories=outcomes).codes
+        keep  = (codes >= 0) & np.isfinite(ev) & np.isfinite(la)
+        self._tree  = cKDTree(self._points(np.asarray(ev)[keep], np.asarray(la)[keep]))
+        self._codes = codes[keep].astype(np.int64)
+        self.k      = min(k, int(keep.sum()))
+        self.grid   = grid
+        if grid is not None:
+            self._ev_edges = np.arange(ev_range[0], ev_range[1] + grid[0], grid[0])
+            self._la_edges = np.arange(la_range[0], la_range[1] + grid[1], grid[1])
+            ev_mid, la_mid = np.meshgrid(self._ev_edges[:-1] + grid[0]/2,
+                                         self._la_edges[:-1] + grid[1]/2, indexing='ij')
+            self._table = self._search(ev_mid.ravel(), la_mid.ravel()).reshape(*ev_mid.shape, -1)
+
+    @staticmethod
+    def _points(ev, la):
+        return np.column_stack([ev, np.asarray(la)*la_per_mph])
+
+    def _search(self, ev, la):
+        _, idx = self._tree.query(self._points(ev, la), self.k, workers=-1)
+        idx  = idx.reshape(len(idx), self.k)
+        # outcome frequencies of each query's neighbours, as one bincount over (row, outcome)
+        cell = np.arange(len(idx))[:,None]*len(outcomes) + self._codes[idx]
+        freq = np.bincount(cell.ravel(), minlength=len(idx)*len(outcomes))
+        return freq.reshape(len(idx), len(outcomes))/idx.shape[1]
+
+    def predict_proba(self, ev, la):
+        '''Probabilities of ``outcomes`` for each batted ball, shape (n, 7). Balls
+        without EV or LA get NaN.'''
+        ev, la = np.asarray(ev, dtype=float), np.asarray(la, dtype=float)
+        probs  = np.full((len(ev), len(outcomes)), np.nan)
+        ok     = np.isfinite(ev) & np.isfinite(la)
+        if self.grid is None:
+            probs[ok] = self._search(ev[ok], la[ok])
+            return probs
+        i = np.clip(np.searchsorted(self._ev_edges, ev[ok], side='right') - 1, 0, self._table.shape[0] - 1)
+        j = np.clip(np.searchsorted(self._la_edges, la[ok], side='right') - 1, 0, self._table.shape[1] - 1)
+        probs[ok] = self._table[i, j]
+        return probs
+
+    def expected_counts(self, bip, by, ev_col='launch_speed', la_col='launch_angle'):
+        '''Sum of the outcome probabilities of the batted balls in ``bip`` per ``by``
+        group, with the columns ``xS``, ``xD``, ... ``xBIPOut``.'''
+        probs = self.predict_proba(bip[ev_col], bip[la_col])
+        probs = pd.DataFrame(probs, columns=['x'+o for o in outcomes], index=bip.index)
+        return probs.groupby([bip[c] for c in by]).sum()